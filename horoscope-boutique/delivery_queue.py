@@ -0,0 +1,224 @@
+"""
+Delivery Queue Module
+Durable SQLite-backed job queue for decoupling horoscope generation from sending
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Channels get separate job streams so a slow email provider never backs up SMS
+CHANNELS = ("sms", "email")
+
+# A claimed job that is not completed or failed within the lease (for example
+# because its worker crashed) becomes claimable again. Each claim gets a
+# fresh lease token, and only its holder may update the job afterwards
+DEFAULT_LEASE_SECONDS = 300
+
+# Failed jobs are retried with exponential backoff until this many attempts
+DEFAULT_MAX_ATTEMPTS = 5
+_MAX_RETRY_DELAY = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS delivery_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    last_error TEXT,
+    lease_token TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS delivery_jobs_ready
+    ON delivery_jobs (channel, status, available_at);
+"""
+
+
+class DeliveryQueueError(Exception):
+    """Custom exception for delivery queue errors"""
+    pass
+
+
+class DeliveryJob(NamedTuple):
+    id: int
+    channel: str
+    payload: Dict
+    attempts: int
+    lease_token: str
+
+
+class DeliveryQueue:
+    """
+    Durable per-channel job queue stored in a SQLite database file.
+    
+    Jobs are claimed under a lease instead of being deleted on read, so a
+    job whose worker dies mid-send is picked up again once the lease runs
+    out. complete, fail and checkpoint only apply while the caller still
+    holds the lease: a worker that overran its lease cannot settle a job
+    another worker has since claimed. Any number of worker threads or
+    processes may share one file.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not be shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly where needed
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    
+    def enqueue(self, channel: str, payload: Dict) -> int:
+        """
+        Add a job to a channel.
+        
+        Args:
+            channel: "sms" or "email"
+            payload: JSON-serializable job data
+        
+        Returns:
+            The new job's id
+        """
+        if channel not in CHANNELS:
+            raise DeliveryQueueError(f"Unknown delivery channel: {channel}")
+        
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO delivery_jobs (channel, payload, available_at, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (channel, json.dumps(payload), now, now)
+        )
+        return cursor.lastrowid
+    
+    def claim(self, channel: str) -> Optional[DeliveryJob]:
+        """
+        Lease the oldest ready job on a channel.
+        
+        Returns:
+            The claimed job, or None when nothing is ready
+        """
+        jobs = self.claim_many(channel, 1)
+        return jobs[0] if jobs else None
+    
+    def claim_many(self, channel: str, limit: int) -> List[DeliveryJob]:
+        """
+        Lease up to limit of the oldest ready jobs on a channel.
+        
+        Returns:
+            The claimed jobs, oldest first (empty when nothing is ready)
+        """
+        conn = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so two workers can never
+        # select and lease the same row
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, payload, attempts FROM delivery_jobs "
+                "WHERE channel = ? AND status IN ('pending', 'leased') AND available_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (channel, now, limit)
+            ).fetchall()
+            jobs = [
+                DeliveryJob(job_id, channel, json.loads(payload), attempts + 1, uuid.uuid4().hex)
+                for job_id, payload, attempts in rows
+            ]
+            conn.executemany(
+                "UPDATE delivery_jobs SET status = 'leased', attempts = ?, available_at = ?, lease_token = ? "
+                "WHERE id = ?",
+                [(job.attempts, now + self.lease_seconds, job.lease_token, job.id) for job in jobs]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        
+        return jobs
+    
+    def _update_leased(self, job: DeliveryJob, assignments: str, params: tuple) -> bool:
+        """Apply an update to a job only while job's lease is still current"""
+        cursor = self._connection().execute(
+            f"UPDATE delivery_jobs SET {assignments} "
+            "WHERE id = ? AND status = 'leased' AND lease_token = ?",
+            params + (job.id, job.lease_token)
+        )
+        if cursor.rowcount == 0:
+            logger.warning(f"Delivery job {job.id} ({job.channel}) lease lost; update discarded")
+            return False
+        return True
+    
+    def checkpoint(self, job: DeliveryJob, payload: Dict) -> bool:
+        """
+        Save a claimed job's progress and renew its lease.
+        
+        Returns:
+            False if the lease was lost and the progress was not saved
+        """
+        return self._update_leased(
+            job, "payload = ?, available_at = ?",
+            (json.dumps(payload), time.time() + self.lease_seconds)
+        )
+    
+    def complete(self, job: DeliveryJob) -> bool:
+        """
+        Mark a claimed job as delivered.
+        
+        Returns:
+            False if the lease was lost and the job was left untouched
+        """
+        return self._update_leased(job, "status = 'done', last_error = NULL, lease_token = NULL", ())
+    
+    def fail(self, job: DeliveryJob, error: str) -> bool:
+        """
+        Record a failed attempt.
+        
+        The job is retried after an exponential backoff (2s, 4s, ... capped
+        at 5 minutes) until max_attempts is reached, then parked as 'dead'.
+        
+        Returns:
+            False if the lease was lost and the job was left untouched
+        """
+        if job.attempts >= self.max_attempts:
+            if not self._update_leased(job, "status = 'dead', last_error = ?, lease_token = NULL", (error,)):
+                return False
+            logger.error(f"Delivery job {job.id} ({job.channel}) gave up after {job.attempts} attempts: {error}")
+            return True
+        
+        delay = min(2 ** job.attempts, _MAX_RETRY_DELAY)
+        if not self._update_leased(
+            job, "status = 'pending', available_at = ?, last_error = ?, lease_token = NULL",
+            (time.time() + delay, error)
+        ):
+            return False
+        logger.warning(f"Delivery job {job.id} ({job.channel}) failed, retrying in {delay}s: {error}")
+        return True
+    
+    def counts(self, channel: Optional[str] = None) -> Dict[str, int]:
+        """Number of jobs per status, optionally for a single channel"""
+        query = "SELECT status, COUNT(*) FROM delivery_jobs"
+        params = ()
+        if channel is not None:
+            query += " WHERE channel = ?"
+            params = (channel,)
+        return dict(self._connection().execute(query + " GROUP BY status", params).fetchall())
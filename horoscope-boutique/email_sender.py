@@ -3,18 +3,80 @@ Email Module - Multi-Provider Support
 Sends horoscope emails via SMTP, Mailgun, or SendGrid
 """
 
+import base64
+import json
+import os
+import queue
+import re
 import smtplib
+import threading
 import requests
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from templating import compile_template, render_template
+from email.header import Header
+from email.utils import formataddr, parseaddr
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Handlers and levels are configured by the application entry point
 logger = logging.getLogger(__name__)
 
 
+# Thread pool size for HTTP provider bulk sends
+DEFAULT_MAX_WORKERS = 16
+
+# Maximum recipients per Mailgun / SendGrid batch API call
+BULK_BATCH_SIZE = 1000
+
+MAILGUN_API_BASE = "https://api.mailgun.net/v3"
+
+# Transient HTTP failures get up to 3 attempts in total: urllib3 retries the
+# first failure immediately and backs off 1s before the last attempt.
+# Read errors are not retried: the provider may already have accepted the mail.
+_RETRY = Retry(
+    total=2,
+    read=0,
+    backoff_factor=0.5,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset({"POST"}),
+    raise_on_status=False
+)
+
+# Shared HTTP session so Mailgun/SendGrid calls reuse kept-alive TLS connections.
+# Its adapter is mounted by _reserve_connections below.
+_SESSION = requests.Session()
+_POOL_LOCK = threading.Lock()
+_pool_maxsize = 0
+
+
+def _reserve_connections(count: int) -> None:
+    """
+    Make the shared session keep at least count connections per provider host.
+    
+    urllib3 still opens a connection for every concurrent request, but it
+    throws away any that do not fit in the pool once the request is done.
+    Bulk senders call this with the concurrency they are about to use, so
+    each of their connections is kept alive for reuse. The pool only grows.
+    """
+    global _pool_maxsize
+    with _POOL_LOCK:
+        if count <= _pool_maxsize:
+            return
+        # pool_connections is the number of per-host pools, not connections;
+        # only the two provider APIs are ever contacted
+        _SESSION.mount(
+            "https://",
+            HTTPAdapter(pool_connections=4, pool_maxsize=count, max_retries=_RETRY)
+        )
+        _pool_maxsize = count
+
+
+_reserve_connections(DEFAULT_MAX_WORKERS)
+
+
 class EmailError(Exception):
     """Custom exception for email sending errors"""
     pass
@@ -160,30 +222,74 @@ HTML_TEMPLATE_COUPLES = """
 """
 
 
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+
+
+def _minify_html(html: str) -> str:
+    """
+    Drop comments, indentation and blank lines from an HTML template.
+    
+    Line breaks are kept so rendered emails stay well within SMTP line
+    length limits; they render the same as the original whitespace.
+    """
+    html = _HTML_COMMENT_RE.sub("", html)
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+HTML_TEMPLATE_SINGLE = _minify_html(HTML_TEMPLATE_SINGLE)
+HTML_TEMPLATE_COUPLES = _minify_html(HTML_TEMPLATE_COUPLES)
+
+# Templates are parsed once at import time and reused for every send
+_SINGLE_TPL = compile_template(HTML_TEMPLATE_SINGLE)
+_COUPLES_TPL = compile_template(HTML_TEMPLATE_COUPLES)
+
+
+# Literal fragments of the plain-text bodies, interleaved with data fields
+_SINGLE_TEXT_PARTS = (
+    "✨ YOUR DAILY HOROSCOPE ✨\n\nDear ",
+    ",\n\n",
+    "\n\n━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n🎨 Lucky Color: ",
+    "\n💫 Today's Mantra: \"",
+    "\"\n🎯 Daily Focus: ",
+    "\n\nWishing you a beautiful day ahead! 💜",
+)
+
+_COUPLES_TEXT_PARTS = (
+    "💕 YOUR COUPLES HOROSCOPE 💕\n\nDear ",
+    " & ",
+    ",\n\n",
+    "\n\n━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n🎨 Lucky Color: ",
+    "\n💫 Shared Mantra: \"",
+    "\"\n💞 Relationship Focus: ",
+    "\n\nWishing you both love and happiness! ❤️",
+)
+
+
 def format_plain_text_single(data: Dict) -> str:
     """Format single horoscope as plain text"""
-    text = f"✨ YOUR DAILY HOROSCOPE ✨\n\n"
-    text += f"Dear {data['name']},\n\n"
-    text += f"{data['horoscope']}\n\n"
-    text += f"━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-    text += f"🎨 Lucky Color: {data['lucky_color']}\n"
-    text += f"💫 Today's Mantra: \"{data['mantra']}\"\n"
-    text += f"🎯 Daily Focus: {data['daily_focus']}\n\n"
-    text += f"Wishing you a beautiful day ahead! 💜"
-    return text
+    p = _SINGLE_TEXT_PARTS
+    return "".join((
+        p[0], str(data['name']),
+        p[1], str(data['horoscope']),
+        p[2], str(data['lucky_color']),
+        p[3], str(data['mantra']),
+        p[4], str(data['daily_focus']),
+        p[5]
+    ))
 
 
 def format_plain_text_couples(data: Dict) -> str:
     """Format couples horoscope as plain text"""
-    text = f"💕 YOUR COUPLES HOROSCOPE 💕\n\n"
-    text += f"Dear {data['name_1']} & {data['name_2']},\n\n"
-    text += f"{data['couples_horoscope']}\n\n"
-    text += f"━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-    text += f"🎨 Lucky Color: {data['lucky_color']}\n"
-    text += f"💫 Shared Mantra: \"{data['shared_mantra']}\"\n"
-    text += f"💞 Relationship Focus: {data['relationship_focus']}\n\n"
-    text += f"Wishing you both love and happiness! ❤️"
-    return text
+    p = _COUPLES_TEXT_PARTS
+    return "".join((
+        p[0], str(data['name_1']),
+        p[1], str(data['name_2']),
+        p[2], str(data['couples_horoscope']),
+        p[3], str(data['lucky_color']),
+        p[4], str(data['shared_mantra']),
+        p[5], str(data['relationship_focus']),
+        p[6]
+    ))
 
 
 def send_email_smtp(
@@ -217,31 +323,11 @@ def send_email_smtp(
         Dict with sending status
     """
     try:
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = from_email
-        msg['To'] = to_email
-        
-        # Attach parts
-        part1 = MIMEText(text_body, 'plain', 'utf-8')
-        part2 = MIMEText(html_body, 'html', 'utf-8')
-        msg.attach(part1)
-        msg.attach(part2)
+        message_bytes = _assemble_mime(subject, from_email, to_email, text_body, html_body)
         
         # Connect and send
-        logger.info(f"Connecting to SMTP server: {smtp_host}:{smtp_port}")
-        
-        if use_tls:
-            server = smtplib.SMTP(smtp_host, smtp_port)
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-        else:
-            server = smtplib.SMTP(smtp_host, smtp_port)
-        
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+        server = _smtp_connect(smtp_host, smtp_port, smtp_user, smtp_password, use_tls)
+        server.sendmail(from_email, [to_email], message_bytes)
         server.quit()
         
         logger.info(f"Email sent successfully to {to_email}")
@@ -262,6 +348,222 @@ def send_email_smtp(
         }
 
 
+def send_email_smtp_batch(
+    smtp_host: str,
+    smtp_port: int,
+    smtp_user: str,
+    smtp_password: str,
+    from_email: str,
+    recipients: List[str],
+    subject: str,
+    html_body: str,
+    text_body: str,
+    use_tls: bool = True
+) -> List[Dict]:
+    """
+    Send the same email to several recipients over a single SMTP connection.
+    
+    The connection handshake (EHLO/STARTTLS/AUTH) happens once and each
+    recipient only costs one message transaction.
+    
+    Args:
+        smtp_host: SMTP server hostname
+        smtp_port: SMTP port
+        smtp_user: SMTP username
+        smtp_password: SMTP password
+        from_email: Sender email address
+        recipients: List of recipient email addresses
+        subject: Email subject
+        html_body: HTML email body
+        text_body: Plain text fallback
+        use_tls: Whether to use TLS encryption
+    
+    Returns:
+        List of per-recipient sending status dicts
+    """
+    if not recipients:
+        return []
+    
+    try:
+        server = _smtp_connect(smtp_host, smtp_port, smtp_user, smtp_password, use_tls)
+    except Exception as e:
+        logger.error(f"SMTP error: {str(e)}")
+        return [
+            {"success": False, "provider": "smtp", "error": str(e), "recipient": email}
+            for email in recipients
+        ]
+    
+    results = []
+    message_bytes = _build_mime_once(subject, from_email, html_body, text_body)
+    
+    try:
+        for email in recipients:
+            try:
+                server.sendmail(
+                    from_email,
+                    [email],
+                    message_bytes.replace(_TO_PLACEHOLDER, _encode_address(email), 1)
+                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Email sent successfully to {email}")
+                results.append({
+                    "success": True,
+                    "provider": "smtp",
+                    "recipient": email
+                })
+            except smtplib.SMTPServerDisconnected as e:
+                # Connection is gone; remaining recipients cannot be sent
+                logger.error(f"SMTP error: {str(e)}")
+                results.extend(
+                    {"success": False, "provider": "smtp", "error": str(e), "recipient": r}
+                    for r in recipients[len(results):]
+                )
+                break
+            except Exception as e:
+                logger.error(f"SMTP error: {str(e)}")
+                results.append({
+                    "success": False,
+                    "provider": "smtp",
+                    "error": str(e),
+                    "recipient": email
+                })
+    finally:
+        try:
+            server.quit()
+        except smtplib.SMTPException:
+            pass
+    
+    return results
+
+
+# Boundary cannot collide with base64 part bodies ('-' is not in the alphabet)
+_MIME_BOUNDARY = b"==horoscope-boutique-alternative=="
+
+
+def _encode_header(value: Optional[str]) -> bytes:
+    """Encode a header value, using RFC 2047 only when it is not ASCII"""
+    if value is None:
+        # Unset config values (e.g. no SMTP_FROM) give an empty header
+        return b""
+    if value.isascii():
+        return value.encode("ascii")
+    return Header(value, "utf-8").encode().encode("ascii")
+
+
+def _encode_address(value: Optional[str]) -> bytes:
+    """
+    Encode a From/To header value.
+    
+    Only a non-ASCII display name is RFC 2047-encoded; the address itself
+    must stay outside the encoded word or parsers cannot find the mailbox.
+    """
+    if value is None or value.isascii():
+        return _encode_header(value)
+    name, address = parseaddr(value)
+    if not address or not address.isascii():
+        # Not a parseable ASCII mailbox; encode it like any other header
+        return _encode_header(value)
+    return formataddr((name, address), charset="utf-8").encode("ascii")
+
+
+@lru_cache(maxsize=32)
+def _encode_part(body: str, subtype: str) -> bytes:
+    """
+    Serialize one base64-encoded text/* part including its headers.
+    
+    Cached on the body text: bulk sends and repeat single sends of the same
+    horoscope reuse the encoded part. Keying on the string (whose hash is
+    computed once and stored on it) rather than id() stays correct if a
+    body is garbage collected and its id reused.
+    """
+    encoded = base64.encodebytes(body.encode("utf-8")).replace(b"\n", b"\r\n")
+    return b"".join((
+        b"Content-Type: text/", subtype.encode("ascii"), b'; charset="utf-8"\r\n',
+        b"MIME-Version: 1.0\r\n",
+        b"Content-Transfer-Encoding: base64\r\n\r\n",
+        encoded
+    ))
+
+
+def _assemble_mime(
+    subject: str,
+    from_email: str,
+    to_email: str,
+    text_body: str,
+    html_body: str
+) -> bytes:
+    """
+    Assemble the multipart/alternative horoscope message as wire-ready bytes.
+    
+    The layout is fixed, so the bytes are built directly instead of going
+    through the email package's message objects and generator.
+    """
+    delimiter = b"--" + _MIME_BOUNDARY
+    return b"".join((
+        b'Content-Type: multipart/alternative; boundary="', _MIME_BOUNDARY, b'"\r\n',
+        b"MIME-Version: 1.0\r\n",
+        b"Subject: ", _encode_header(subject), b"\r\n",
+        b"From: ", _encode_address(from_email), b"\r\n",
+        b"To: ", _encode_address(to_email), b"\r\n",
+        b"\r\n",
+        delimiter, b"\r\n",
+        _encode_part(text_body, "plain"),
+        delimiter, b"\r\n",
+        _encode_part(html_body, "html"),
+        delimiter, b"--\r\n"
+    ))
+
+
+# Stand-in To: header value swapped for each recipient in batch sends
+_TO_PLACEHOLDER = b"__TO__"
+
+
+@lru_cache(maxsize=8)
+def _build_mime_once(
+    subject: str,
+    from_email: str,
+    html_body: str,
+    text_body: str
+) -> bytes:
+    """
+    Serialize the horoscope message once with a placeholder recipient.
+    
+    Only the To: header differs between recipients, so batch sends reuse
+    these bytes instead of re-encoding both MIME parts per message.
+    """
+    return _assemble_mime(
+        subject, from_email, _TO_PLACEHOLDER.decode("ascii"), text_body, html_body
+    )
+
+
+def _smtp_connect(
+    smtp_host: str,
+    smtp_port: int,
+    smtp_user: str,
+    smtp_password: str,
+    use_tls: bool = True
+) -> smtplib.SMTP:
+    """Open an authenticated SMTP connection"""
+    logger.debug(f"Connecting to SMTP server: {smtp_host}:{smtp_port}")
+    
+    if use_tls:
+        server = smtplib.SMTP(smtp_host, smtp_port)
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+    else:
+        server = smtplib.SMTP(smtp_host, smtp_port)
+    
+    server.login(smtp_user, smtp_password)
+    return server
+
+
+@lru_cache(maxsize=16)
+def _mailgun_messages_url(domain: str) -> str:
+    """Messages endpoint for a Mailgun domain, built once per domain"""
+    return f"{MAILGUN_API_BASE}/{domain}/messages"
+
+
 def send_email_mailgun(
     api_key: str,
     domain: str,
@@ -287,7 +589,7 @@ def send_email_mailgun(
         Dict with sending status
     """
     try:
-        url = f"https://api.mailgun.net/v3/{domain}/messages"
+        url = _mailgun_messages_url(domain)
         
         data = {
             "from": from_email,
@@ -297,9 +599,9 @@ def send_email_mailgun(
             "html": html_body
         }
         
-        logger.info(f"Sending email via Mailgun to {to_email}")
+        logger.debug(f"Sending email via Mailgun to {to_email}")
         
-        response = requests.post(
+        response = _SESSION.post(
             url,
             auth=("api", api_key),
             data=data,
@@ -309,7 +611,7 @@ def send_email_mailgun(
         response.raise_for_status()
         response_data = response.json()
         
-        logger.info(f"Email sent successfully. Message ID: {response_data.get('id')}")
+        logger.info(f"Email sent successfully to {to_email}. Message ID: {response_data.get('id')}")
         
         return {
             "success": True,
@@ -334,7 +636,8 @@ def send_email_sendgrid(
     to_email: str,
     subject: str,
     html_body: str,
-    text_body: str
+    text_body: str,
+    headers: Optional[Dict[str, str]] = None
 ) -> Dict:
     """
     Send email via SendGrid API.
@@ -346,6 +649,7 @@ def send_email_sendgrid(
         subject: Email subject
         html_body: HTML email body
         text_body: Plain text fallback
+        headers: Pre-built request headers (built from api_key if None)
     
     Returns:
         Dict with sending status
@@ -353,43 +657,23 @@ def send_email_sendgrid(
     try:
         url = "https://api.sendgrid.com/v3/mail/send"
         
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+        if headers is None:
+            headers = _sendgrid_headers(api_key)
         
-        data = {
-            "personalizations": [
-                {
-                    "to": [{"email": to_email}]
-                }
-            ],
-            "from": {"email": from_email},
-            "subject": subject,
-            "content": [
-                {
-                    "type": "text/plain",
-                    "value": text_body
-                },
-                {
-                    "type": "text/html",
-                    "value": html_body
-                }
-            ]
-        }
+        data = _sendgrid_payload([to_email], from_email, subject, html_body, text_body)
         
-        logger.info(f"Sending email via SendGrid to {to_email}")
+        logger.debug(f"Sending email via SendGrid to {to_email}")
         
-        response = requests.post(
+        response = _SESSION.post(
             url,
             headers=headers,
-            json=data,
+            data=data,
             timeout=10
         )
         
         response.raise_for_status()
         
-        logger.info(f"Email sent successfully via SendGrid")
+        logger.info(f"Email sent successfully to {to_email} via SendGrid")
         
         return {
             "success": True,
@@ -408,6 +692,355 @@ def send_email_sendgrid(
         }
 
 
+def _sendgrid_headers(api_key: str) -> Dict[str, str]:
+    """Request headers for the SendGrid v3 API"""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+@lru_cache(maxsize=8)
+def _sendgrid_skeleton(
+    from_email: str,
+    subject: str,
+    html_body: str,
+    text_body: str
+) -> bytes:
+    """
+    JSON-encode the recipient-independent part of a SendGrid request.
+    
+    Returned without its opening brace so personalizations can be spliced
+    in front of it.
+    """
+    skeleton = json.dumps({
+        "from": {"email": from_email},
+        "subject": subject,
+        "content": [
+            {
+                "type": "text/plain",
+                "value": text_body
+            },
+            {
+                "type": "text/html",
+                "value": html_body
+            }
+        ]
+    })
+    return skeleton[1:].encode("utf-8")
+
+
+def _sendgrid_payload(
+    recipients: List[str],
+    from_email: str,
+    subject: str,
+    html_body: str,
+    text_body: str
+) -> bytes:
+    """Build a SendGrid mail/send body, encoding the email content only once"""
+    personalizations = json.dumps([
+        {"to": [{"email": email}]} for email in recipients
+    ])
+    return b"".join((
+        b'{"personalizations": ',
+        personalizations.encode("utf-8"),
+        b", ",
+        _sendgrid_skeleton(from_email, subject, html_body, text_body)
+    ))
+
+
+def send_email_mailgun_bulk(
+    api_key: str,
+    domain: str,
+    from_email: str,
+    recipients: List[str],
+    subject: str,
+    html_body: str,
+    text_body: str
+) -> List[Dict]:
+    """
+    Send the same email to several recipients with one Mailgun API call.
+    
+    Passing recipient-variables makes Mailgun deliver an individual copy to
+    each address instead of one message with every recipient in To.
+    
+    Args:
+        api_key: Mailgun API key
+        domain: Mailgun domain
+        from_email: Sender email address
+        recipients: Recipient email addresses (at most BULK_BATCH_SIZE)
+        subject: Email subject
+        html_body: HTML email body
+        text_body: Plain text fallback
+    
+    Returns:
+        List of per-recipient sending status dicts
+    """
+    try:
+        url = _mailgun_messages_url(domain)
+        
+        data = {
+            "from": from_email,
+            "to": recipients,
+            "subject": subject,
+            "text": text_body,
+            "html": html_body,
+            "recipient-variables": json.dumps({email: {} for email in recipients})
+        }
+        
+        logger.debug(f"Sending email via Mailgun to {len(recipients)} recipient(s)")
+        
+        response = _SESSION.post(
+            url,
+            auth=("api", api_key),
+            data=data,
+            timeout=10
+        )
+        
+        response.raise_for_status()
+        response_data = response.json()
+        
+        logger.debug(f"Batch accepted by Mailgun. Message ID: {response_data.get('id')}")
+        
+        return [
+            {
+                "success": True,
+                "provider": "mailgun",
+                "recipient": email,
+                "message_id": response_data.get("id")
+            }
+            for email in recipients
+        ]
+        
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Mailgun error: {str(e)}")
+        return [
+            {"success": False, "provider": "mailgun", "error": str(e), "recipient": email}
+            for email in recipients
+        ]
+
+
+def send_email_sendgrid_bulk(
+    api_key: str,
+    from_email: str,
+    recipients: List[str],
+    subject: str,
+    html_body: str,
+    text_body: str,
+    headers: Optional[Dict[str, str]] = None
+) -> List[Dict]:
+    """
+    Send the same email to several recipients with one SendGrid API call.
+    
+    Every recipient gets its own personalization, so each one receives an
+    individual message.
+    
+    Args:
+        api_key: SendGrid API key
+        from_email: Sender email address
+        recipients: Recipient email addresses (at most BULK_BATCH_SIZE)
+        subject: Email subject
+        html_body: HTML email body
+        text_body: Plain text fallback
+        headers: Pre-built request headers (built from api_key if None)
+    
+    Returns:
+        List of per-recipient sending status dicts
+    """
+    try:
+        url = "https://api.sendgrid.com/v3/mail/send"
+        
+        if headers is None:
+            headers = _sendgrid_headers(api_key)
+        
+        data = _sendgrid_payload(recipients, from_email, subject, html_body, text_body)
+        
+        logger.debug(f"Sending email via SendGrid to {len(recipients)} recipient(s)")
+        
+        response = _SESSION.post(
+            url,
+            headers=headers,
+            data=data,
+            timeout=10
+        )
+        
+        response.raise_for_status()
+        
+        logger.debug(f"Batch accepted by SendGrid")
+        
+        return [
+            {
+                "success": True,
+                "provider": "sendgrid",
+                "recipient": email,
+                "status_code": response.status_code
+            }
+            for email in recipients
+        ]
+        
+    except requests.exceptions.RequestException as e:
+        logger.error(f"SendGrid error: {str(e)}")
+        return [
+            {"success": False, "provider": "sendgrid", "error": str(e), "recipient": email}
+            for email in recipients
+        ]
+
+
+def _render_bodies(horoscope_data: Dict, is_couples: bool = False) -> Tuple[str, str, str]:
+    """
+    Render (subject, html_body, text_body) for a horoscope.
+    
+    The output only depends on the horoscope itself, never on the recipient,
+    so identical horoscopes are served from an in-memory cache.
+    """
+    try:
+        key = frozenset(horoscope_data.items())
+    except TypeError:
+        # Unhashable values (e.g. nested lists) - render without caching
+        return _render_bodies_uncached(horoscope_data, is_couples)
+    return _render_bodies_cached(key, is_couples)
+
+
+@lru_cache(maxsize=32)
+def _render_bodies_cached(key: frozenset, is_couples: bool) -> Tuple[str, str, str]:
+    return _render_bodies_uncached(dict(key), is_couples)
+
+
+def _render_bodies_uncached(horoscope_data: Dict, is_couples: bool) -> Tuple[str, str, str]:
+    if is_couples:
+        html_body = render_template(_COUPLES_TPL, horoscope_data)
+        text_body = format_plain_text_couples(horoscope_data)
+        subject = "Your Couples Horoscope"
+    else:
+        html_body = render_template(_SINGLE_TPL, horoscope_data)
+        text_body = format_plain_text_single(horoscope_data)
+        subject = "Your Daily Horoscope"
+    return subject, html_body, text_body
+
+
+class _BoundProvider(NamedTuple):
+    """Provider senders with their configuration already bound"""
+    send: Callable[[str, str, str, str], Dict]
+    send_batch: Callable[[List[str], str, str, str], List[Dict]]
+    # Recipients per send_batch call (None: every recipient in one call)
+    batch_size: Optional[int] = BULK_BATCH_SIZE
+    # Cap on concurrent send_batch calls (None: the caller's limit)
+    max_concurrency: Optional[int] = None
+
+
+def _send_email_smtp_each(
+    smtp_host: str,
+    smtp_port: int,
+    smtp_user: str,
+    smtp_password: str,
+    from_email: str,
+    recipients: List[str],
+    subject: str,
+    html_body: str,
+    text_body: str,
+    use_tls: bool = True
+) -> List[Dict]:
+    """Send to each recipient over its own SMTP connection (pooling disabled)"""
+    return [
+        send_email_smtp(
+            smtp_host, smtp_port, smtp_user, smtp_password, from_email,
+            email, subject, html_body, text_body, use_tls
+        )
+        for email in recipients
+    ]
+
+
+def _bind_smtp(
+    smtp_host: Optional[str] = None,
+    smtp_port: int = 587,
+    smtp_user: Optional[str] = None,
+    smtp_password: Optional[str] = None,
+    from_email: Optional[str] = None,
+    use_tls: bool = True,
+    pool: bool = True,
+    max_connections: int = 1,
+    max_messages: int = 0,
+    **_unused
+) -> _BoundProvider:
+    # Pooled: each connection carries up to max_messages messages (0: no
+    # limit) before a fresh one is opened, with at most max_connections
+    # connections open at once
+    batch = send_email_smtp_batch if pool else _send_email_smtp_each
+    return _BoundProvider(
+        send=partial(
+            send_email_smtp, smtp_host, smtp_port, smtp_user, smtp_password,
+            from_email, use_tls=use_tls
+        ),
+        send_batch=partial(
+            batch, smtp_host, smtp_port, smtp_user, smtp_password,
+            from_email, use_tls=use_tls
+        ),
+        batch_size=(max_messages or None) if pool else None,
+        max_concurrency=max(1, int(max_connections)) if pool else 1
+    )
+
+
+def _bind_mailgun(
+    api_key: Optional[str] = None,
+    domain: Optional[str] = None,
+    from_email: Optional[str] = None,
+    **_unused
+) -> _BoundProvider:
+    return _BoundProvider(
+        send=partial(send_email_mailgun, api_key, domain, from_email),
+        send_batch=partial(send_email_mailgun_bulk, api_key, domain, from_email)
+    )
+
+
+def _bind_sendgrid(
+    api_key: Optional[str] = None,
+    from_email: Optional[str] = None,
+    **_unused
+) -> _BoundProvider:
+    # Built once here and shared by every request made through this binding
+    headers = _sendgrid_headers(api_key)
+    return _BoundProvider(
+        send=partial(send_email_sendgrid, api_key, from_email, headers=headers),
+        send_batch=partial(send_email_sendgrid_bulk, api_key, from_email, headers=headers)
+    )
+
+
+# Provider name -> factory binding its configuration once per send call
+_PROVIDER_DISPATCH: Dict[str, Callable[..., _BoundProvider]] = {
+    "smtp": _bind_smtp,
+    "mailgun": _bind_mailgun,
+    "sendgrid": _bind_sendgrid,
+}
+
+
+def _bind_provider(provider: str, **provider_config) -> _BoundProvider:
+    """Validate the provider name and bind its configuration"""
+    factory = _PROVIDER_DISPATCH.get(provider)
+    if factory is None:
+        raise EmailError(f"Unknown provider: {provider}")
+    return factory(**provider_config)
+
+
+def _failed_results(recipients: List[str], error: str) -> List[Dict]:
+    """Per-recipient failure results sharing one error"""
+    return [
+        {"success": False, "error": error, "recipient": email}
+        for email in recipients
+    ]
+
+
+def _batch_recipients(sender: _BoundProvider, recipients: List[str]) -> List[List[str]]:
+    """Split recipients into provider-sized batches"""
+    size = sender.batch_size
+    if size is None:
+        # One call (for SMTP, one connection) carries every recipient
+        return [list(recipients)] if recipients else []
+    return [
+        recipients[i:i + size]
+        for i in range(0, len(recipients), size)
+    ]
+
+
 def send_horoscope_email(
     provider: str,
     to_email: str,
@@ -429,54 +1062,13 @@ def send_horoscope_email(
         Dict with sending status
     """
     try:
+        sender = _bind_provider(provider, **provider_config)
+        
         # Format email content
-        if is_couples:
-            html_body = HTML_TEMPLATE_COUPLES.format(**horoscope_data)
-            text_body = format_plain_text_couples(horoscope_data)
-            subject = "Your Couples Horoscope"
-        else:
-            html_body = HTML_TEMPLATE_SINGLE.format(**horoscope_data)
-            text_body = format_plain_text_single(horoscope_data)
-            subject = "Your Daily Horoscope"
+        subject, html_body, text_body = _render_bodies(horoscope_data, is_couples)
         
         # Send via selected provider
-        if provider == "smtp":
-            return send_email_smtp(
-                smtp_host=provider_config.get("smtp_host"),
-                smtp_port=provider_config.get("smtp_port", 587),
-                smtp_user=provider_config.get("smtp_user"),
-                smtp_password=provider_config.get("smtp_password"),
-                from_email=provider_config.get("from_email"),
-                to_email=to_email,
-                subject=subject,
-                html_body=html_body,
-                text_body=text_body,
-                use_tls=provider_config.get("use_tls", True)
-            )
-        
-        elif provider == "mailgun":
-            return send_email_mailgun(
-                api_key=provider_config.get("api_key"),
-                domain=provider_config.get("domain"),
-                from_email=provider_config.get("from_email"),
-                to_email=to_email,
-                subject=subject,
-                html_body=html_body,
-                text_body=text_body
-            )
-        
-        elif provider == "sendgrid":
-            return send_email_sendgrid(
-                api_key=provider_config.get("api_key"),
-                from_email=provider_config.get("from_email"),
-                to_email=to_email,
-                subject=subject,
-                html_body=html_body,
-                text_body=text_body
-            )
-        
-        else:
-            raise EmailError(f"Unknown provider: {provider}")
+        return sender.send(to_email, subject, html_body, text_body)
         
     except Exception as e:
         logger.error(f"Error sending horoscope email: {str(e)}")
@@ -492,33 +1084,169 @@ def send_to_multiple_emails(
     recipients: List[str],
     horoscope_data: Dict,
     is_couples: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    providers_fallback: Optional[List[Tuple[str, Dict]]] = None,
     **provider_config
 ) -> Dict:
     """
     Send horoscope to multiple email addresses.
     
+    The email bodies are rendered once and reused for every recipient.
+    SMTP sends share one connection (with the pool options, up to
+    max_connections connections of max_messages messages each); Mailgun and
+    SendGrid use their batch APIs (BULK_BATCH_SIZE recipients per call),
+    with batches sent concurrently from a thread pool.
+    
     Args:
         provider: Email provider to use
         recipients: List of email addresses
         horoscope_data: Horoscope data
         is_couples: Whether this is a couples horoscope
+        max_workers: Maximum concurrent batch requests for HTTP providers
+        providers_fallback: Optional (provider, provider_config) pairs tried
+            in order for recipients the previous provider failed to reach
+        **provider_config: Provider configuration
+    
+    Returns:
+        Dict with results for all recipients
+    """
+    try:
+        sender = _bind_provider(provider, **provider_config)
+        subject, html_body, text_body = _render_bodies(horoscope_data, is_couples)
+    except Exception as e:
+        logger.error(f"Error preparing horoscope email: {str(e)}")
+        return _summarize_results(recipients, _failed_results(recipients, str(e)))
+    
+    def send_batch(batch: List[str]) -> List[Dict]:
+        try:
+            return sender.send_batch(batch, subject, html_body, text_body)
+        except Exception as e:
+            logger.error(f"Error sending horoscope email: {str(e)}")
+            return _failed_results(batch, str(e))
+    
+    batches = _batch_recipients(sender, recipients)
+    workers = min(max_workers, sender.max_concurrency or max_workers, len(batches))
+    
+    if workers <= 1:
+        batch_results = [send_batch(batch) for batch in batches]
+    else:
+        _reserve_connections(workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batch_results = list(executor.map(send_batch, batches))
+    
+    results = [result for batch in batch_results for result in batch]
+    
+    if providers_fallback:
+        results = _apply_fallbacks(
+            results, providers_fallback, horoscope_data, is_couples, max_workers
+        )
+    
+    return _log_summary(provider, _summarize_results(recipients, results))
+
+
+def send_to_multiple_emails_parallel(
+    provider: str,
+    recipients: List[str],
+    horoscope_data: Dict,
+    is_couples: bool = False,
+    max_processes: Optional[int] = None,
+    **provider_config
+) -> Dict:
+    """
+    Send horoscope to a large recipient list using several processes.
+    
+    Meant for big SMTP campaigns, where building and sending each message
+    is Python work bound by the GIL: recipients are split into one shard
+    per process and every process runs the single-connection SMTP batch
+    for its shard. HTTP providers are I/O bound and already batched, so
+    they are sent in-process via send_to_multiple_emails.
+    
+    Args:
+        provider: Email provider to use
+        recipients: List of email addresses
+        horoscope_data: Horoscope data (must be picklable)
+        is_couples: Whether this is a couples horoscope
+        max_processes: Number of worker processes (default: CPU count)
         **provider_config: Provider configuration
     
     Returns:
         Dict with results for all recipients
     """
+    processes = min(max_processes or os.cpu_count() or 1, len(recipients))
+    
+    if provider != "smtp" or processes <= 1:
+        return send_to_multiple_emails(
+            provider, recipients, horoscope_data, is_couples, **provider_config
+        )
+    
+    shard_size = -(-len(recipients) // processes)
+    shards = [
+        recipients[i:i + shard_size]
+        for i in range(0, len(recipients), shard_size)
+    ]
+    
     results = []
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [
+            executor.submit(
+                send_to_multiple_emails,
+                provider, shard, horoscope_data, is_couples, **provider_config
+            )
+            for shard in shards
+        ]
+        for shard, future in zip(shards, futures):
+            try:
+                results.extend(future.result()["results"])
+            except Exception as e:
+                logger.error(f"Error in email worker process: {str(e)}")
+                results.extend(_failed_results(shard, str(e)))
     
-    for email in recipients:
-        result = send_horoscope_email(
-            provider=provider,
-            to_email=email,
+    return _log_summary(provider, _summarize_results(recipients, results))
+
+
+def _apply_fallbacks(
+    results: List[Dict],
+    providers_fallback: List[Tuple[str, Dict]],
+    horoscope_data: Dict,
+    is_couples: bool,
+    max_workers: int = DEFAULT_MAX_WORKERS
+) -> List[Dict]:
+    """Re-send failed recipients through each fallback provider in turn"""
+    for fallback_provider, fallback_config in providers_fallback:
+        failed = [r["recipient"] for r in results if not r.get("success")]
+        if not failed:
+            break
+        
+        logger.warning(
+            f"Retrying {len(failed)} recipient(s) via fallback provider {fallback_provider}"
+        )
+        retried = send_to_multiple_emails(
+            provider=fallback_provider,
+            recipients=failed,
             horoscope_data=horoscope_data,
             is_couples=is_couples,
-            **provider_config
+            max_workers=max_workers,
+            **fallback_config
         )
-        results.append(result)
+        by_recipient = {r["recipient"]: r for r in retried["results"]}
+        results = [
+            r if r.get("success") else by_recipient.get(r["recipient"], r)
+            for r in results
+        ]
     
+    return results
+
+
+def _log_summary(provider: str, summary: Dict) -> Dict:
+    """Emit one aggregated log line for a multi-recipient send"""
+    logger.info(
+        f"Sent {summary['successful']}/{summary['total_sent']} horoscope email(s) via {provider}"
+    )
+    return summary
+
+
+def _summarize_results(recipients: List[str], results: List[Dict]) -> Dict:
+    """Aggregate per-recipient results into a delivery summary"""
     success_count = sum(1 for r in results if r.get("success"))
     
     return {
@@ -529,6 +1257,163 @@ def send_to_multiple_emails(
     }
 
 
+class _EmailJob(NamedTuple):
+    provider: str
+    to_email: str
+    horoscope_data: Dict
+    is_couples: bool
+    provider_config: Dict
+    future: Future
+
+
+class EmailQueue:
+    """
+    Bounded in-process email queue drained by background worker threads.
+    
+    enqueue() returns a Future immediately. Workers pop up to batch_size
+    queued jobs at a time, group jobs that share a provider, configuration
+    and horoscope, and deliver each group with send_to_multiple_emails so
+    the batched SMTP / bulk HTTP paths are used.
+    """
+    
+    def __init__(self, max_workers: int = 8, maxsize: int = 10000, batch_size: int = 64):
+        self._queue: "queue.Queue[Optional[_EmailJob]]" = queue.Queue(maxsize=maxsize)
+        self._max_workers = max_workers
+        self._batch_size = batch_size
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+    
+    def enqueue(
+        self,
+        provider: str,
+        to_email: str,
+        horoscope_data: Dict,
+        is_couples: bool = False,
+        **provider_config
+    ) -> Future:
+        """Queue one horoscope email; the Future resolves to its send result"""
+        self._start()
+        future: Future = Future()
+        self._queue.put(_EmailJob(
+            provider, to_email, horoscope_data, is_couples, provider_config, future
+        ))
+        return future
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers, draining queued emails first if wait is True"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        if wait:
+            self._queue.join()
+        for _ in workers:
+            self._queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+    
+    def _start(self) -> None:
+        # Workers are only started once the first email is queued
+        with self._lock:
+            if self._workers:
+                return
+            # Every worker may have a Mailgun / SendGrid request in flight
+            _reserve_connections(self._max_workers)
+            for i in range(self._max_workers):
+                worker = threading.Thread(
+                    target=self._run, name=f"EmailQueue-{i}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            
+            batch = [job]
+            while len(batch) < self._batch_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    # Finish this batch, then exit
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(job)
+            
+            try:
+                self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _deliver(self, batch: List[_EmailJob]) -> None:
+        groups: Dict[tuple, List[_EmailJob]] = {}
+        for job in batch:
+            if job.future.set_running_or_notify_cancel():
+                groups.setdefault(_job_group_key(job), []).append(job)
+        
+        for jobs in groups.values():
+            first = jobs[0]
+            try:
+                summary = send_to_multiple_emails(
+                    first.provider,
+                    [j.to_email for j in jobs],
+                    first.horoscope_data,
+                    first.is_couples,
+                    **first.provider_config
+                )
+            except Exception as e:
+                logger.error(f"Error delivering queued emails: {str(e)}")
+                for j in jobs:
+                    j.future.set_exception(e)
+                continue
+            
+            for j, result in zip(jobs, summary["results"]):
+                j.future.set_result(result)
+
+
+def _job_group_key(job: _EmailJob) -> tuple:
+    """Jobs with equal keys can be delivered in one multi-recipient send"""
+    try:
+        config_key = frozenset(job.provider_config.items())
+        hash(config_key)
+    except TypeError:
+        config_key = id(job.provider_config)
+    return (job.provider, job.is_couples, id(job.horoscope_data), config_key)
+
+
+_default_queue: Optional[EmailQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def enqueue_horoscope_email(
+    provider: str,
+    to_email: str,
+    horoscope_data: Dict,
+    is_couples: bool = False,
+    **provider_config
+) -> Future:
+    """
+    Queue a horoscope email on the shared background EmailQueue.
+    
+    Returns immediately; the Future resolves to the same status dict
+    send_horoscope_email would return.
+    """
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = EmailQueue()
+    return _default_queue.enqueue(
+        provider, to_email, horoscope_data, is_couples, **provider_config
+    )
+
+
 # Example usage and testing
 if __name__ == "__main__":
     print("=" * 60)
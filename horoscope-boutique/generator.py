@@ -4,8 +4,10 @@ Generates uplifting single and couples horoscopes
 """
 
 import random
-from datetime import datetime
-from typing import Dict, Optional
+import sys
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+from templating import compile_template, render_template
 
 # Master Prompt Templates
 SINGLE_HOROSCOPE_TEMPLATE = """
@@ -62,24 +64,28 @@ STRUCTURE:
 Generate the couples horoscope now:
 """
 
+# Prompt templates are parsed once at import time and reused for every call
+_SINGLE_PROMPT = compile_template(SINGLE_HOROSCOPE_TEMPLATE)
+_COUPLES_PROMPT = compile_template(COUPLES_HOROSCOPE_TEMPLATE)
+
 # Lucky colors by zodiac sign
 LUCKY_COLORS = {
-    "aries": ["Red", "Coral", "Scarlet"],
-    "taurus": ["Green", "Pink", "Emerald"],
-    "gemini": ["Yellow", "Light Blue", "Silver"],
-    "cancer": ["White", "Silver", "Pale Blue"],
-    "leo": ["Gold", "Orange", "Purple"],
-    "virgo": ["Navy Blue", "Grey", "Beige"],
-    "libra": ["Pink", "Light Blue", "Lavender"],
-    "scorpio": ["Deep Red", "Black", "Burgundy"],
-    "sagittarius": ["Purple", "Royal Blue", "Turquoise"],
-    "capricorn": ["Brown", "Dark Green", "Charcoal"],
-    "aquarius": ["Electric Blue", "Silver", "Turquoise"],
-    "pisces": ["Sea Green", "Lavender", "Aquamarine"]
+    "aries": ("Red", "Coral", "Scarlet"),
+    "taurus": ("Green", "Pink", "Emerald"),
+    "gemini": ("Yellow", "Light Blue", "Silver"),
+    "cancer": ("White", "Silver", "Pale Blue"),
+    "leo": ("Gold", "Orange", "Purple"),
+    "virgo": ("Navy Blue", "Grey", "Beige"),
+    "libra": ("Pink", "Light Blue", "Lavender"),
+    "scorpio": ("Deep Red", "Black", "Burgundy"),
+    "sagittarius": ("Purple", "Royal Blue", "Turquoise"),
+    "capricorn": ("Brown", "Dark Green", "Charcoal"),
+    "aquarius": ("Electric Blue", "Silver", "Turquoise"),
+    "pisces": ("Sea Green", "Lavender", "Aquamarine")
 }
 
 # Uplifting mantras
-MANTRAS = [
+MANTRAS = (
     "I am exactly where I need to be",
     "I embrace growth with an open heart",
     "My energy attracts beautiful possibilities",
@@ -92,10 +98,10 @@ MANTRAS = [
     "My heart is open to new connections",
     "I honor my emotions and my truth",
     "I am creating the life I deserve"
-]
+)
 
 # Shared mantras for couples
-SHARED_MANTRAS = [
+SHARED_MANTRAS = (
     "Together, we are stronger",
     "Our love grows deeper each day",
     "We choose each other, always",
@@ -108,23 +114,101 @@ SHARED_MANTRAS = [
     "Together, we can overcome anything",
     "Our love story is just beginning",
     "We nurture what we've built together"
-]
+)
 
 # Daily focus areas
-DAILY_FOCUS = [
+DAILY_FOCUS = (
     "Self-care", "Communication", "Creativity", "Connection",
     "Gratitude", "Joy", "Growth", "Balance", "Adventure",
     "Reflection", "Love", "Courage", "Renewal", "Trust",
     "Expression", "Compassion", "Discovery", "Peace"
-]
+)
 
 # Relationship focus areas
-RELATIONSHIP_FOCUS = [
+RELATIONSHIP_FOCUS = (
     "Communication", "Trust", "Intimacy", "Adventure",
     "Growth", "Support", "Playfulness", "Understanding",
     "Passion", "Partnership", "Harmony", "Unity",
     "Celebration", "Connection", "Renewal", "Dreams"
-]
+)
+
+
+# Example horoscope texts, compiled once; only the chosen one is rendered per call
+_SINGLE_EXAMPLE_TEMPLATES = tuple(compile_template(text) for text in (
+    "Dear {name}, today's cosmic energy brings a wave of renewal and possibility. As a {sign_cap}, you're particularly attuned to the shifts happening around you, and this is your moment to shine. The universe is aligning to support your dreams, encouraging you to trust your intuition and take meaningful steps forward. You may feel a surge of creative inspiration or a desire to connect more deeply with those you cherish. Remember, growth sometimes asks you to be vulnerable, but that vulnerability is your strength. Embrace this day with an open heart, knowing you're exactly where you need to be. Your authentic self is your greatest gift, and the world is ready to receive it. Trust the process, {name}, and watch as beautiful opportunities unfold before you.",
+    
+    "{name}, the stars are sending you powerful affirmations today. As a {sign_cap}, your natural gifts are being amplified by celestial energy that celebrates authenticity and courage. This is a time to honor your feelings, express your truth, and take bold steps toward what makes your soul sing. You might encounter situations that challenge you to grow, but these are invitations to discover your inner resilience. The connections you nurture today will flourish, and your presence brings warmth to everyone around you. Don't be afraid to ask for what you need—the universe supports those who honor their worth. Your journey is unfolding beautifully, even if you can't see the full picture yet. Keep your heart open, trust your path, and remember that you're surrounded by love and possibility."
+))
+
+_COUPLES_EXAMPLE_TEMPLATES = tuple(compile_template(text) for text in (
+    "{name_1} and {name_2}, your combined energy is creating something truly magical right now. As a {sign_1_cap} and {sign_2_cap} pairing, you bring complementary strengths that make your bond uniquely powerful. {name_1}, your natural {sign_1_cap} qualities help ground this relationship in authenticity, while {name_2}, your {sign_2_cap} energy adds depth and emotional richness. This period invites you both to celebrate how far you've come together and to dream even bigger about your shared future. You're entering a phase where communication flows more easily, where understanding deepens naturally, and where your love feels renewed. Any challenges you face become opportunities to strengthen your connection and prove to yourselves just how resilient your partnership is. Take time this week to do something special together—even small gestures carry profound meaning now. Your love story is evolving beautifully, and the universe is conspiring to bring you even closer. Trust each other, celebrate each other, and know that your bond is a source of strength for both of you.",
+    
+    "Beautiful souls {name_1} and {name_2}, the cosmic energy surrounding your relationship is radiant with possibility. Your {sign_1_cap}-{sign_2_cap} connection brings together two different but harmonious energies, creating a partnership that's both stable and dynamic. {name_1}, you bring gifts of {sign_1_cap} wisdom that help navigate life's complexities, while {name_2}, your {sign_2_cap} spirit adds passion and spontaneity to your shared journey. Right now, the stars are highlighting the importance of mutual support and shared dreams. You're being reminded that your partnership is a safe haven where both of you can be completely authentic. This is a powerful time for intimate conversations, for planning adventures together, and for reconnecting with why you chose each other. Any moments of tension are simply invitations to practice deeper understanding and compassion. Your love has a sacred quality to it—treasure it, nurture it, and watch it blossom even more beautifully. The universe celebrates your union and surrounds you both with abundant blessings."
+))
+
+
+# Palettes for signs missing from LUCKY_COLORS
+_DEFAULT_SINGLE_COLORS = ("Blue",)
+_DEFAULT_COUPLES_COLORS = ("Pink",)
+
+
+class _SignInfo(NamedTuple):
+    """Normalized forms of a zodiac sign"""
+    key: str
+    label: str
+    colors: Tuple[str, ...]
+
+
+# Every common casing of each sign resolves straight to its normalized record
+_SIGN_INDEX: Dict[str, _SignInfo] = {}
+for _key, _colors in LUCKY_COLORS.items():
+    _info = _SignInfo(_key, sys.intern(_key.capitalize()), _colors)
+    for _variant in (_key, _info.label, sys.intern(_key.upper())):
+        _SIGN_INDEX[_variant] = _info
+del _key, _colors, _info, _variant
+
+
+def _lookup_sign(sign: str, default_colors: Tuple[str, ...]) -> _SignInfo:
+    """Resolve a user-supplied sign; unknown signs get the given default palette"""
+    info = _SIGN_INDEX.get(sign) or _SIGN_INDEX.get(sign.lower())
+    if info is None:
+        # Not interned: unknown input is never looked up again, and interned
+        # strings would stay alive for the life of the process
+        key = sign.lower()
+        info = _SignInfo(key, key.capitalize(), default_colors)
+    return info
+
+
+def _draw_indices(*sizes: int) -> list:
+    """
+    Pick one index per pool size from a single 64-bit random draw.
+    
+    The draw is consumed as a mixed-radix number; with pools this small
+    the bias against a uniform pick is far below 1e-15. It comes from the
+    shared `random` module state, so random.seed() makes output repeatable.
+    """
+    bits = random.getrandbits(64)
+    indices = []
+    for size in sizes:
+        bits, index = divmod(bits, size)
+        indices.append(index)
+    return indices
+
+
+# (epoch second, formatted UTC timestamp) of the most recent generation
+_TS_CACHE = (0, "")
+
+
+def _generated_at() -> str:
+    """ISO-8601 UTC timestamp at second granularity, formatted once per second"""
+    global _TS_CACHE
+    now = int(time.time())
+    cached_second, stamp = _TS_CACHE
+    if now != cached_second:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        # Swap the whole tuple so concurrent callers never see a torn pair
+        _TS_CACHE = (now, stamp)
+    return stamp
 
 
 def generate_single_horoscope(
@@ -145,38 +229,40 @@ def generate_single_horoscope(
     Returns:
         Dict with horoscope data
     """
-    sign = sign.lower()
+    sign_info = _lookup_sign(sign, _DEFAULT_SINGLE_COLORS)
     
     if context is None:
         context = "No specific context provided. Generate based on general positive energy."
     
     # Fill the template
-    prompt = SINGLE_HOROSCOPE_TEMPLATE.format(
-        name=name,
-        sign=sign.capitalize(),
-        context=context
-    )
+    prompt = render_template(_SINGLE_PROMPT, {
+        "name": name,
+        "sign": sign_info.label,
+        "context": context
+    })
     
     # If AI function provided, use it; otherwise return example
     if ai_generate_func:
         horoscope_text = ai_generate_func(prompt)
     else:
         # Generate example horoscope
-        horoscope_text = generate_example_single_horoscope(name, sign)
+        horoscope_text = generate_example_single_horoscope(name, sign_info.key)
     
     # Select lucky elements
-    lucky_color = random.choice(LUCKY_COLORS.get(sign, ["Blue"]))
-    mantra = random.choice(MANTRAS)
-    daily_focus = random.choice(DAILY_FOCUS)
+    colors = sign_info.colors
+    i_color, i_mantra, i_focus = _draw_indices(len(colors), len(MANTRAS), len(DAILY_FOCUS))
+    lucky_color = colors[i_color]
+    mantra = MANTRAS[i_mantra]
+    daily_focus = DAILY_FOCUS[i_focus]
     
     return {
         "name": name,
-        "sign": sign.capitalize(),
+        "sign": sign_info.label,
         "horoscope": horoscope_text,
         "lucky_color": lucky_color,
         "mantra": mantra,
         "daily_focus": daily_focus,
-        "generated_at": datetime.utcnow().isoformat() + "Z"
+        "generated_at": _generated_at()
     }
 
 
@@ -202,67 +288,73 @@ def generate_couples_horoscope(
     Returns:
         Dict with couples horoscope data
     """
-    sign_1 = sign_1.lower()
-    sign_2 = sign_2.lower()
+    sign_info_1 = _lookup_sign(sign_1, _DEFAULT_SINGLE_COLORS)
+    sign_info_2 = _lookup_sign(sign_2, _DEFAULT_COUPLES_COLORS)
     
     if context is None:
         context = "No specific relationship context provided. Focus on general positive partnership energy."
     
     # Fill the template
-    prompt = COUPLES_HOROSCOPE_TEMPLATE.format(
-        name_1=name_1,
-        sign_1=sign_1.capitalize(),
-        name_2=name_2,
-        sign_2=sign_2.capitalize(),
-        context=context
-    )
+    prompt = render_template(_COUPLES_PROMPT, {
+        "name_1": name_1,
+        "sign_1": sign_info_1.label,
+        "name_2": name_2,
+        "sign_2": sign_info_2.label,
+        "context": context
+    })
     
     # If AI function provided, use it; otherwise return example
     if ai_generate_func:
         horoscope_text = ai_generate_func(prompt)
     else:
         # Generate example horoscope
-        horoscope_text = generate_example_couples_horoscope(name_1, sign_1, name_2, sign_2)
+        horoscope_text = generate_example_couples_horoscope(
+            name_1, sign_info_1.key, name_2, sign_info_2.key
+        )
     
     # Select lucky elements (blend both signs)
-    colors_1 = LUCKY_COLORS.get(sign_1, ["Blue"])
-    colors_2 = LUCKY_COLORS.get(sign_2, ["Pink"])
-    lucky_color = random.choice(colors_1 + colors_2)
+    colors_1 = sign_info_1.colors
+    colors_2 = sign_info_2.colors
+    i_color, i_mantra, i_focus = _draw_indices(
+        len(colors_1) + len(colors_2), len(SHARED_MANTRAS), len(RELATIONSHIP_FOCUS)
+    )
+    # Index across both palettes without building the concatenated list
+    if i_color < len(colors_1):
+        lucky_color = colors_1[i_color]
+    else:
+        lucky_color = colors_2[i_color - len(colors_1)]
     
-    shared_mantra = random.choice(SHARED_MANTRAS)
-    relationship_focus = random.choice(RELATIONSHIP_FOCUS)
+    shared_mantra = SHARED_MANTRAS[i_mantra]
+    relationship_focus = RELATIONSHIP_FOCUS[i_focus]
     
     return {
         "name_1": name_1,
-        "sign_1": sign_1.capitalize(),
+        "sign_1": sign_info_1.label,
         "name_2": name_2,
-        "sign_2": sign_2.capitalize(),
+        "sign_2": sign_info_2.label,
         "couples_horoscope": horoscope_text,
         "lucky_color": lucky_color,
         "shared_mantra": shared_mantra,
         "relationship_focus": relationship_focus,
-        "generated_at": datetime.utcnow().isoformat() + "Z"
+        "generated_at": _generated_at()
     }
 
 
 def generate_example_single_horoscope(name: str, sign: str) -> str:
     """Generate a realistic example horoscope for demonstration"""
-    templates = [
-        f"Dear {name}, today's cosmic energy brings a wave of renewal and possibility. As a {sign.capitalize()}, you're particularly attuned to the shifts happening around you, and this is your moment to shine. The universe is aligning to support your dreams, encouraging you to trust your intuition and take meaningful steps forward. You may feel a surge of creative inspiration or a desire to connect more deeply with those you cherish. Remember, growth sometimes asks you to be vulnerable, but that vulnerability is your strength. Embrace this day with an open heart, knowing you're exactly where you need to be. Your authentic self is your greatest gift, and the world is ready to receive it. Trust the process, {name}, and watch as beautiful opportunities unfold before you.",
-        
-        f"{name}, the stars are sending you powerful affirmations today. As a {sign.capitalize()}, your natural gifts are being amplified by celestial energy that celebrates authenticity and courage. This is a time to honor your feelings, express your truth, and take bold steps toward what makes your soul sing. You might encounter situations that challenge you to grow, but these are invitations to discover your inner resilience. The connections you nurture today will flourish, and your presence brings warmth to everyone around you. Don't be afraid to ask for what you need—the universe supports those who honor their worth. Your journey is unfolding beautifully, even if you can't see the full picture yet. Keep your heart open, trust your path, and remember that you're surrounded by love and possibility."
-    ]
-    return random.choice(templates)
+    template = random.choice(_SINGLE_EXAMPLE_TEMPLATES)
+    return render_template(template, {"name": name, "sign_cap": sign.capitalize()})
 
 
 def generate_example_couples_horoscope(name_1: str, sign_1: str, name_2: str, sign_2: str) -> str:
     """Generate a realistic example couples horoscope"""
-    templates = [
-        f"{name_1} and {name_2}, your combined energy is creating something truly magical right now. As a {sign_1.capitalize()} and {sign_2.capitalize()} pairing, you bring complementary strengths that make your bond uniquely powerful. {name_1}, your natural {sign_1.capitalize()} qualities help ground this relationship in authenticity, while {name_2}, your {sign_2.capitalize()} energy adds depth and emotional richness. This period invites you both to celebrate how far you've come together and to dream even bigger about your shared future. You're entering a phase where communication flows more easily, where understanding deepens naturally, and where your love feels renewed. Any challenges you face become opportunities to strengthen your connection and prove to yourselves just how resilient your partnership is. Take time this week to do something special together—even small gestures carry profound meaning now. Your love story is evolving beautifully, and the universe is conspiring to bring you even closer. Trust each other, celebrate each other, and know that your bond is a source of strength for both of you.",
-        
-        f"Beautiful souls {name_1} and {name_2}, the cosmic energy surrounding your relationship is radiant with possibility. Your {sign_1.capitalize()}-{sign_2.capitalize()} connection brings together two different but harmonious energies, creating a partnership that's both stable and dynamic. {name_1}, you bring gifts of {sign_1.capitalize()} wisdom that help navigate life's complexities, while {name_2}, your {sign_2.capitalize()} spirit adds passion and spontaneity to your shared journey. Right now, the stars are highlighting the importance of mutual support and shared dreams. You're being reminded that your partnership is a safe haven where both of you can be completely authentic. This is a powerful time for intimate conversations, for planning adventures together, and for reconnecting with why you chose each other. Any moments of tension are simply invitations to practice deeper understanding and compassion. Your love has a sacred quality to it—treasure it, nurture it, and watch it blossom even more beautifully. The universe celebrates your union and surrounds you both with abundant blessings."
-    ]
-    return random.choice(templates)
+    template = random.choice(_COUPLES_EXAMPLE_TEMPLATES)
+    return render_template(template, {
+        "name_1": name_1,
+        "sign_1_cap": sign_1.capitalize(),
+        "name_2": name_2,
+        "sign_2_cap": sign_2.capitalize()
+    })
 
 
 # Example usage and testing
@@ -6,30 +6,112 @@ Interactive CLI tool to generate and send horoscopes via SMS and/or Email
 
 import sys
 import argparse
+import logging
 import os
-from typing import Optional
+import types
+from functools import lru_cache
+from typing import Dict, Optional
 
-# Import our modules
+# Import our modules. The sms and email_sender stacks are imported inside
+# the delivery branches so runs that skip a channel never load it.
 from generator import generate_single_horoscope, generate_couples_horoscope
-from sms import send_horoscope_sms, send_to_multiple as send_sms_to_multiple
-from email_sender import send_horoscope_email, send_to_multiple_emails as send_email_to_multiple
+
+
+# Environment snapshot, read once at startup
+CONFIG = types.SimpleNamespace(
+    voipms_username=os.getenv("VOIPMS_API_USERNAME"),
+    voipms_password=os.getenv("VOIPMS_API_PASSWORD"),
+    voipms_did=os.getenv("VOIPMS_DID"),
+    email_provider=os.getenv("EMAIL_PROVIDER", "smtp"),
+    smtp_host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+    smtp_port=os.getenv("SMTP_PORT", "587"),
+    smtp_user=os.getenv("SMTP_USER"),
+    smtp_password=os.getenv("SMTP_PASSWORD"),
+    smtp_from=os.getenv("SMTP_FROM"),
+    mailgun_api_key=os.getenv("MAILGUN_API_KEY"),
+    mailgun_domain=os.getenv("MAILGUN_DOMAIN"),
+    mailgun_from=os.getenv("MAILGUN_FROM"),
+    sendgrid_api_key=os.getenv("SENDGRID_API_KEY"),
+    sendgrid_from=os.getenv("SENDGRID_FROM"),
+)
+
+
+def _smtp_email_config() -> Dict:
+    """SMTP settings from the environment snapshot"""
+    return {
+        "smtp_host": CONFIG.smtp_host,
+        "smtp_port": int(CONFIG.smtp_port),
+        "smtp_user": CONFIG.smtp_user,
+        "smtp_password": CONFIG.smtp_password,
+        "from_email": CONFIG.smtp_from
+    }
+
+
+def _mailgun_email_config() -> Dict:
+    """Mailgun settings from the environment snapshot"""
+    return {
+        "api_key": CONFIG.mailgun_api_key,
+        "domain": CONFIG.mailgun_domain,
+        "from_email": CONFIG.mailgun_from
+    }
+
+
+def _sendgrid_email_config() -> Dict:
+    """SendGrid settings from the environment snapshot"""
+    return {
+        "api_key": CONFIG.sendgrid_api_key,
+        "from_email": CONFIG.sendgrid_from
+    }
+
+
+_EMAIL_BUILDERS = {
+    "smtp": _smtp_email_config,
+    "mailgun": _mailgun_email_config,
+    "sendgrid": _sendgrid_email_config,
+}
+
+
+@lru_cache(maxsize=4)
+def _build_email_config(provider: str) -> Optional[Dict]:
+    """
+    Keyword config for the given email provider, built once per provider.
+    
+    Returns None for unknown providers so callers can report and bail out.
+    The environment is a startup snapshot, so the cached dict never goes
+    stale; callers only unpack it and must not mutate it.
+    """
+    builder = _EMAIL_BUILDERS.get(provider)
+    return builder() if builder else None
+
+
+def _write_lines(*lines):
+    """Write several lines to stdout in one call, like consecutive print()s"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _nonempty(*values):
+    """Return the given values that were actually provided, in order"""
+    return [value for value in values if value]
 
 
 def print_banner():
     """Print welcome banner"""
-    print("\n" + "=" * 60)
-    print("✨ POSITIVE HOROSCOPE GENERATOR ✨")
-    print("=" * 60 + "\n")
+    _write_lines(
+        "\n" + "=" * 60,
+        "✨ POSITIVE HOROSCOPE GENERATOR ✨",
+        "=" * 60 + "\n"
+    )
 
 
 def print_result(title, data):
     """Print formatted results"""
-    print("\n" + "=" * 60)
-    print(f"{title}")
-    print("=" * 60)
-    for key, value in data.items():
-        print(f"{key}: {value}")
-    print("=" * 60 + "\n")
+    _write_lines(
+        "\n" + "=" * 60,
+        f"{title}",
+        "=" * 60,
+        *(f"{key}: {value}" for key, value in data.items()),
+        "=" * 60 + "\n"
+    )
 
 
 def get_input(prompt, default=None):
@@ -45,21 +127,27 @@ def get_input(prompt, default=None):
 
 def interactive_single_mode(args):
     """Interactive mode for single person horoscope"""
-    print("\n📝 SINGLE PERSON HOROSCOPE")
-    print("-" * 60)
+    _write_lines(
+        "\n📝 SINGLE PERSON HOROSCOPE",
+        "-" * 60
+    )
     
     # Gather information
     name = get_input("Recipient's name", "Friend")
     sign = get_input("Zodiac sign", "Aries")
     
     # Optional context
-    print("\nOptional: Provide context about their current situation")
-    print("(Press Enter to skip)")
+    _write_lines(
+        "\nOptional: Provide context about their current situation",
+        "(Press Enter to skip)"
+    )
     context = get_input("Context", None)
     
     # Delivery channels
-    print("\n📱 DELIVERY OPTIONS")
-    print("-" * 60)
+    _write_lines(
+        "\n📱 DELIVERY OPTIONS",
+        "-" * 60
+    )
     
     send_sms = False
     send_email = False
@@ -100,51 +188,35 @@ def interactive_single_mode(args):
     # Send via selected channels
     if send_sms and phone:
         print("\n📱 Sending SMS...")
+        from sms import send_horoscope_sms
         result = send_horoscope_sms(
-            api_username=os.getenv("VOIPMS_API_USERNAME"),
-            api_password=os.getenv("VOIPMS_API_PASSWORD"),
-            did=os.getenv("VOIPMS_DID"),
+            api_username=CONFIG.voipms_username,
+            api_password=CONFIG.voipms_password,
+            did=CONFIG.voipms_did,
             dst=phone,
             horoscope_data=horoscope,
             is_couples=False
         )
         
         if result.get("success"):
-            print(f"✅ SMS sent successfully to {phone}!")
-            print(f"   Segments sent: {result.get('segments_sent')}")
+            _write_lines(
+                f"✅ SMS sent successfully to {phone}!",
+                f"   Segments sent: {result.get('segments_sent')}"
+            )
         else:
             print(f"❌ SMS failed: {result.get('error')}")
     
     if send_email and email:
         print("\n📧 Sending email...")
+        from email_sender import send_horoscope_email
         
-        provider = os.getenv("EMAIL_PROVIDER", "smtp")
-        
-        if provider == "smtp":
-            email_config = {
-                "smtp_host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
-                "smtp_port": int(os.getenv("SMTP_PORT", "587")),
-                "smtp_user": os.getenv("SMTP_USER"),
-                "smtp_password": os.getenv("SMTP_PASSWORD"),
-                "from_email": os.getenv("SMTP_FROM")
-            }
-        elif provider == "mailgun":
-            email_config = {
-                "api_key": os.getenv("MAILGUN_API_KEY"),
-                "domain": os.getenv("MAILGUN_DOMAIN"),
-                "from_email": os.getenv("MAILGUN_FROM")
-            }
-        elif provider == "sendgrid":
-            email_config = {
-                "api_key": os.getenv("SENDGRID_API_KEY"),
-                "from_email": os.getenv("SENDGRID_FROM")
-            }
-        else:
-            print(f"❌ Unknown email provider: {provider}")
+        email_config = _build_email_config(CONFIG.email_provider)
+        if email_config is None:
+            print(f"❌ Unknown email provider: {CONFIG.email_provider}")
             return
         
         result = send_horoscope_email(
-            provider=provider,
+            provider=CONFIG.email_provider,
             to_email=email,
             horoscope_data=horoscope,
             is_couples=False,
@@ -161,8 +233,10 @@ def interactive_single_mode(args):
 
 def interactive_couples_mode(args):
     """Interactive mode for couples horoscope"""
-    print("\n💕 COUPLES HOROSCOPE")
-    print("-" * 60)
+    _write_lines(
+        "\n💕 COUPLES HOROSCOPE",
+        "-" * 60
+    )
     
     # Gather information
     print("\nPartner 1:")
@@ -174,14 +248,18 @@ def interactive_couples_mode(args):
     sign_2 = get_input("Zodiac sign")
     
     # Optional context
-    print("\nOptional: Provide context about their relationship")
-    print("(e.g., 'long distance', 'planning wedding', 'new parents')")
-    print("(Press Enter to skip)")
+    _write_lines(
+        "\nOptional: Provide context about their relationship",
+        "(e.g., 'long distance', 'planning wedding', 'new parents')",
+        "(Press Enter to skip)"
+    )
     context = get_input("Relationship context", None)
     
     # Delivery channels
-    print("\n📱 DELIVERY OPTIONS")
-    print("-" * 60)
+    _write_lines(
+        "\n📱 DELIVERY OPTIONS",
+        "-" * 60
+    )
     
     send_sms = False
     send_email = False
@@ -192,13 +270,13 @@ def interactive_couples_mode(args):
         send_sms = True
         phone_1 = get_input(f"{name_1}'s phone (optional)", None)
         phone_2 = get_input(f"{name_2}'s phone (optional)", None)
-        phones = [p for p in [phone_1, phone_2] if p]
+        phones = _nonempty(phone_1, phone_2)
     
     if args.email or args.both:
         send_email = True
         email_1 = get_input(f"{name_1}'s email (optional)", None)
         email_2 = get_input(f"{name_2}'s email (optional)", None)
-        emails = [e for e in [email_1, email_2] if e]
+        emails = _nonempty(email_1, email_2)
     
     # If no specific channel chosen, ask
     if not send_sms and not send_email:
@@ -207,12 +285,12 @@ def interactive_couples_mode(args):
             send_sms = True
             phone_1 = get_input(f"{name_1}'s phone (optional)", None)
             phone_2 = get_input(f"{name_2}'s phone (optional)", None)
-            phones = [p for p in [phone_1, phone_2] if p]
+            phones = _nonempty(phone_1, phone_2)
         if choice in ["email", "both"]:
             send_email = True
             email_1 = get_input(f"{name_1}'s email (optional)", None)
             email_2 = get_input(f"{name_2}'s email (optional)", None)
-            emails = [e for e in [email_1, email_2] if e]
+            emails = _nonempty(email_1, email_2)
     
     # Generate couples horoscope
     print("\n⏳ Generating couples horoscope...")
@@ -229,10 +307,11 @@ def interactive_couples_mode(args):
     # Send via selected channels
     if send_sms and phones:
         print(f"\n📱 Sending SMS to {len(phones)} recipient(s)...")
+        from sms import send_to_multiple as send_sms_to_multiple
         result = send_sms_to_multiple(
-            api_username=os.getenv("VOIPMS_API_USERNAME"),
-            api_password=os.getenv("VOIPMS_API_PASSWORD"),
-            did=os.getenv("VOIPMS_DID"),
+            api_username=CONFIG.voipms_username,
+            api_password=CONFIG.voipms_password,
+            did=CONFIG.voipms_did,
             destinations=phones,
             horoscope_data=horoscope,
             is_couples=True
@@ -244,34 +323,15 @@ def interactive_couples_mode(args):
     
     if send_email and emails:
         print(f"\n📧 Sending email to {len(emails)} recipient(s)...")
+        from email_sender import send_to_multiple_emails as send_email_to_multiple
         
-        provider = os.getenv("EMAIL_PROVIDER", "smtp")
-        
-        if provider == "smtp":
-            email_config = {
-                "smtp_host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
-                "smtp_port": int(os.getenv("SMTP_PORT", "587")),
-                "smtp_user": os.getenv("SMTP_USER"),
-                "smtp_password": os.getenv("SMTP_PASSWORD"),
-                "from_email": os.getenv("SMTP_FROM")
-            }
-        elif provider == "mailgun":
-            email_config = {
-                "api_key": os.getenv("MAILGUN_API_KEY"),
-                "domain": os.getenv("MAILGUN_DOMAIN"),
-                "from_email": os.getenv("MAILGUN_FROM")
-            }
-        elif provider == "sendgrid":
-            email_config = {
-                "api_key": os.getenv("SENDGRID_API_KEY"),
-                "from_email": os.getenv("SENDGRID_FROM")
-            }
-        else:
-            print(f"❌ Unknown email provider: {provider}")
+        email_config = _build_email_config(CONFIG.email_provider)
+        if email_config is None:
+            print(f"❌ Unknown email provider: {CONFIG.email_provider}")
             return
         
         result = send_email_to_multiple(
-            provider=provider,
+            provider=CONFIG.email_provider,
             recipients=emails,
             horoscope_data=horoscope,
             is_couples=True,
@@ -287,6 +347,9 @@ def interactive_couples_mode(args):
 
 def main():
     """Main entry point"""
+    # The sender modules only create loggers; output is configured here
+    logging.basicConfig(level=logging.INFO)
+    
     parser = argparse.ArgumentParser(
         description="Generate and send positive horoscopes",
         epilog="Example: python local_send.py --sms --couple"
@@ -304,26 +367,34 @@ def main():
     
     # Check environment variables
     if args.sms or args.both:
-        if not os.getenv("VOIPMS_API_USERNAME") or not os.getenv("VOIPMS_API_PASSWORD"):
-            print("⚠️  WARNING: VoIP.ms credentials not found in environment variables")
-            print("   Set VOIPMS_API_USERNAME, VOIPMS_API_PASSWORD, and VOIPMS_DID")
-            print("   SMS sending will fail without these credentials.\n")
+        if not CONFIG.voipms_username or not CONFIG.voipms_password:
+            _write_lines(
+                "⚠️  WARNING: VoIP.ms credentials not found in environment variables",
+                "   Set VOIPMS_API_USERNAME, VOIPMS_API_PASSWORD, and VOIPMS_DID",
+                "   SMS sending will fail without these credentials.\n"
+            )
     
     if args.email or args.both:
-        provider = os.getenv("EMAIL_PROVIDER", "smtp")
+        provider = CONFIG.email_provider
         if provider == "smtp":
-            if not os.getenv("SMTP_USER") or not os.getenv("SMTP_PASSWORD"):
-                print("⚠️  WARNING: SMTP credentials not found in environment variables")
-                print("   Set SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM")
-                print("   Email sending will fail without these credentials.\n")
+            if not CONFIG.smtp_user or not CONFIG.smtp_password:
+                _write_lines(
+                    "⚠️  WARNING: SMTP credentials not found in environment variables",
+                    "   Set SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM",
+                    "   Email sending will fail without these credentials.\n"
+                )
         elif provider == "mailgun":
-            if not os.getenv("MAILGUN_API_KEY"):
-                print("⚠️  WARNING: Mailgun credentials not found")
-                print("   Set MAILGUN_API_KEY, MAILGUN_DOMAIN, MAILGUN_FROM\n")
+            if not CONFIG.mailgun_api_key:
+                _write_lines(
+                    "⚠️  WARNING: Mailgun credentials not found",
+                    "   Set MAILGUN_API_KEY, MAILGUN_DOMAIN, MAILGUN_FROM\n"
+                )
         elif provider == "sendgrid":
-            if not os.getenv("SENDGRID_API_KEY"):
-                print("⚠️  WARNING: SendGrid credentials not found")
-                print("   Set SENDGRID_API_KEY, SENDGRID_FROM\n")
+            if not CONFIG.sendgrid_api_key:
+                _write_lines(
+                    "⚠️  WARNING: SendGrid credentials not found",
+                    "   Set SENDGRID_API_KEY, SENDGRID_FROM\n"
+                )
     
     print_banner()
     
@@ -3,27 +3,46 @@ Scheduler Module
 Handles automated daily horoscope sending with multiple delivery modes
 """
 
+import json
 import os
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Optional
 from generator import generate_single_horoscope, generate_couples_horoscope
-from sms import send_horoscope_sms, send_to_multiple as send_sms_to_multiple
-from email_sender import send_horoscope_email, send_to_multiple_emails
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from sms import (
+    DEFAULT_MAX_WORKERS, clean_phone, format_couples_horoscope_sms, format_single_horoscope_sms,
+    send_horoscope_sms, send_sms_voipms, send_to_multiple as send_sms_to_multiple, split_tagged_message
 )
+from email_sender import BULK_BATCH_SIZE, send_horoscope_email, send_to_multiple_emails
+from delivery_queue import DeliveryJob, DeliveryQueue
+
 logger = logging.getLogger(__name__)
 
 
+def _read_positive_int(name: str, default: int) -> int:
+    """Integer setting from the environment, falling back to the default if malformed or below 1"""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        logger.warning(f"Ignoring invalid {name}={raw!r}; using {default}")
+        return default
+    return value
+
+
 class SchedulerConfig:
     """Configuration for scheduled horoscope delivery"""
     
     def __init__(self):
         # Delivery mode: "sms", "email", "both", "couple_sms", "couple_email", "couple_both"
+        # (assigning it also sets is_couples / wants_sms / wants_email)
         self.DELIVERY_MODE = os.getenv("DELIVERY_MODE", "sms")
         
         # Single person configuration
@@ -57,6 +76,9 @@ class SchedulerConfig:
         self.SMTP_USER = os.getenv("SMTP_USER", "")
         self.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
         self.SMTP_FROM = os.getenv("SMTP_FROM", "")
+        # Each pooled connection carries up to SMTP_POOL_MAXMSGS messages
+        self.SMTP_POOL_SIZE = _read_positive_int("SMTP_POOL_SIZE", 5)
+        self.SMTP_POOL_MAXMSGS = _read_positive_int("SMTP_POOL_MAXMSGS", 100)
         
         # Mailgun configuration
         self.MAILGUN_API_KEY = os.getenv("MAILGUN_API_KEY", "")
@@ -66,6 +88,41 @@ class SchedulerConfig:
         # SendGrid configuration
         self.SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
         self.SENDGRID_FROM = os.getenv("SENDGRID_FROM", "")
+        
+        # Durable delivery queue (SQLite file); when set, deliveries are
+        # enqueued per destination and sent by process_delivery_queue workers
+        self.DELIVERY_QUEUE_PATH = os.getenv("DELIVERY_QUEUE_PATH", "")
+        
+        # Phone numbers are digit-cleaned once here rather than on every send
+        self.PHONE = clean_phone(self.PHONE)
+        self.PHONE_1 = clean_phone(self.PHONE_1)
+        self.PHONE_2 = clean_phone(self.PHONE_2)
+        self.VOIPMS_DID = clean_phone(self.VOIPMS_DID)
+    
+    @property
+    def DELIVERY_MODE(self) -> str:
+        return self._delivery_mode
+    
+    @DELIVERY_MODE.setter
+    def DELIVERY_MODE(self, mode: str) -> None:
+        # Parse the mode once here so delivery code branches on plain flags
+        self._delivery_mode = mode
+        self.is_couples = mode.startswith("couple_")
+        channels = mode[len("couple_"):] if self.is_couples else mode
+        self.wants_sms = channels in ("sms", "both")
+        self.wants_email = channels in ("email", "both")
+
+
+@lru_cache(maxsize=1)
+def get_config() -> SchedulerConfig:
+    """
+    Process-wide SchedulerConfig, read from the environment on first use.
+    
+    The environment does not change while the scheduler runs, so every
+    delivery shares one instance; build a SchedulerConfig directly to
+    customize settings.
+    """
+    return SchedulerConfig()
 
 
 def send_daily_horoscope(config: Optional[SchedulerConfig] = None) -> Dict:
@@ -73,35 +130,44 @@ def send_daily_horoscope(config: Optional[SchedulerConfig] = None) -> Dict:
     Main function to send daily horoscope based on configuration.
     
     Args:
-        config: SchedulerConfig instance (creates new one if None)
+        config: SchedulerConfig instance (uses the shared get_config() if None)
     
     Returns:
         Dict with delivery status
     """
     if config is None:
-        config = SchedulerConfig()
+        config = get_config()
+    
+    # One timestamp per delivery, shared by every result dict
+    started = time.monotonic()
+    timestamp = _utc_timestamp()
     
     logger.info(f"Starting daily horoscope delivery. Mode: {config.DELIVERY_MODE}")
     
     try:
-        # Determine if couples mode
-        is_couples_mode = config.DELIVERY_MODE.startswith("couple_")
-        
-        if is_couples_mode:
-            return send_couples_horoscope_scheduled(config)
+        if config.is_couples:
+            results = send_couples_horoscope_scheduled(config, timestamp)
         else:
-            return send_single_horoscope_scheduled(config)
+            results = send_single_horoscope_scheduled(config, timestamp)
             
     except Exception as e:
         logger.error(f"Error in daily horoscope delivery: {str(e)}")
-        return {
+        results = {
             "success": False,
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": timestamp
         }
+    
+    results["elapsed_ms"] = int((time.monotonic() - started) * 1000)
+    return results
+
 
+def _utc_timestamp() -> str:
+    """Current time as a timezone-aware UTC ISO 8601 string"""
+    return datetime.now(timezone.utc).isoformat()
 
-def send_single_horoscope_scheduled(config: SchedulerConfig) -> Dict:
+
+def send_single_horoscope_scheduled(config: SchedulerConfig, timestamp: Optional[str] = None) -> Dict:
     """Send single person horoscope"""
     
     # Generate horoscope
@@ -115,11 +181,14 @@ def send_single_horoscope_scheduled(config: SchedulerConfig) -> Dict:
         "success": True,
         "mode": "single",
         "delivery_mode": config.DELIVERY_MODE,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": timestamp or _utc_timestamp()
     }
     
+    # Channel -> destinations; sent directly or enqueued once all are known
+    deliveries: Dict[str, List[str]] = {}
+    
     # Send via SMS
-    if config.DELIVERY_MODE in ["sms", "both"]:
+    if config.wants_sms:
         if not config.PHONE:
             logger.warning("SMS delivery requested but no phone number configured")
             results["sms_error"] = "No phone number configured"
@@ -128,37 +197,25 @@ def send_single_horoscope_scheduled(config: SchedulerConfig) -> Dict:
             results["sms_error"] = "VoIP.ms not configured"
         else:
             logger.info(f"Sending SMS to {config.PHONE}")
-            sms_result = send_horoscope_sms(
-                api_username=config.VOIPMS_USERNAME,
-                api_password=config.VOIPMS_PASSWORD,
-                did=config.VOIPMS_DID,
-                dst=config.PHONE,
-                horoscope_data=horoscope_data,
-                is_couples=False
-            )
-            results["sms_result"] = sms_result
+            deliveries["sms"] = [config.PHONE]
     
     # Send via Email
-    if config.DELIVERY_MODE in ["email", "both"]:
+    if config.wants_email:
         if not config.EMAIL:
             logger.warning("Email delivery requested but no email configured")
             results["email_error"] = "No email configured"
         else:
             logger.info(f"Sending email to {config.EMAIL}")
-            email_config = get_email_config(config)
-            email_result = send_horoscope_email(
-                provider=config.EMAIL_PROVIDER,
-                to_email=config.EMAIL,
-                horoscope_data=horoscope_data,
-                is_couples=False,
-                **email_config
-            )
-            results["email_result"] = email_result
+            deliveries["email"] = [config.EMAIL]
     
+    if config.DELIVERY_QUEUE_PATH:
+        results.update(_enqueue_deliveries(config, deliveries, horoscope_data, is_couples=False))
+    else:
+        results.update(_run_channels(_channel_sends(config, deliveries, horoscope_data, is_couples=False)))
     return results
 
 
-def send_couples_horoscope_scheduled(config: SchedulerConfig) -> Dict:
+def send_couples_horoscope_scheduled(config: SchedulerConfig, timestamp: Optional[str] = None) -> Dict:
     """Send couples horoscope"""
     
     # Generate couples horoscope
@@ -174,15 +231,14 @@ def send_couples_horoscope_scheduled(config: SchedulerConfig) -> Dict:
         "success": True,
         "mode": "couples",
         "delivery_mode": config.DELIVERY_MODE,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": timestamp or _utc_timestamp()
     }
     
-    # Determine delivery channels
-    send_sms = config.DELIVERY_MODE in ["couple_sms", "couple_both"]
-    send_email = config.DELIVERY_MODE in ["couple_email", "couple_both"]
+    # Channel -> destinations; sent directly or enqueued once all are known
+    deliveries: Dict[str, List[str]] = {}
     
     # Send via SMS
-    if send_sms:
+    if config.wants_sms:
         phone_numbers = []
         if config.PHONE_1:
             phone_numbers.append(config.PHONE_1)
@@ -197,18 +253,10 @@ def send_couples_horoscope_scheduled(config: SchedulerConfig) -> Dict:
             results["sms_error"] = "VoIP.ms not configured"
         else:
             logger.info(f"Sending SMS to {len(phone_numbers)} recipient(s)")
-            sms_result = send_sms_to_multiple(
-                api_username=config.VOIPMS_USERNAME,
-                api_password=config.VOIPMS_PASSWORD,
-                did=config.VOIPMS_DID,
-                destinations=phone_numbers,
-                horoscope_data=horoscope_data,
-                is_couples=True
-            )
-            results["sms_result"] = sms_result
+            deliveries["sms"] = phone_numbers
     
     # Send via Email
-    if send_email:
+    if config.wants_email:
         email_addresses = []
         if config.EMAIL_1:
             email_addresses.append(config.EMAIL_1)
@@ -220,15 +268,272 @@ def send_couples_horoscope_scheduled(config: SchedulerConfig) -> Dict:
             results["email_error"] = "No email addresses configured"
         else:
             logger.info(f"Sending email to {len(email_addresses)} recipient(s)")
-            email_config = get_email_config(config)
-            email_result = send_to_multiple_emails(
+            deliveries["email"] = email_addresses
+    
+    if config.DELIVERY_QUEUE_PATH:
+        results.update(_enqueue_deliveries(config, deliveries, horoscope_data, is_couples=True))
+    else:
+        results.update(_run_channels(_channel_sends(config, deliveries, horoscope_data, is_couples=True)))
+    return results
+
+
+def _channel_sends(
+    config: SchedulerConfig,
+    deliveries: Dict[str, List[str]],
+    horoscope_data: Dict,
+    is_couples: bool
+) -> Dict[str, Callable[[], Dict]]:
+    """
+    Build the direct send for each channel with destinations, keyed by result key.
+    
+    Single deliveries go through the one-recipient senders and keep their
+    result shape; couples deliveries use the multi-recipient senders.
+    """
+    channels: Dict[str, Callable[[], Dict]] = {}
+    
+    if "sms" in deliveries:
+        credentials = {
+            "api_username": config.VOIPMS_USERNAME,
+            "api_password": config.VOIPMS_PASSWORD,
+            "did": config.VOIPMS_DID
+        }
+        if is_couples:
+            channels["sms_result"] = partial(
+                send_sms_to_multiple, destinations=deliveries["sms"],
+                horoscope_data=horoscope_data, is_couples=True, **credentials
+            )
+        else:
+            channels["sms_result"] = partial(
+                send_horoscope_sms, dst=deliveries["sms"][0],
+                horoscope_data=horoscope_data, is_couples=False, **credentials
+            )
+    
+    if "email" in deliveries:
+        email_config = get_email_config(config)
+        if is_couples:
+            channels["email_result"] = partial(
+                send_to_multiple_emails, provider=config.EMAIL_PROVIDER, recipients=deliveries["email"],
+                horoscope_data=horoscope_data, is_couples=True, **email_config
+            )
+        else:
+            channels["email_result"] = partial(
+                send_horoscope_email, provider=config.EMAIL_PROVIDER, to_email=deliveries["email"][0],
+                horoscope_data=horoscope_data, is_couples=False, **email_config
+            )
+    
+    return channels
+
+
+def _run_channels(channels: Dict[str, Callable[[], Dict]]) -> Dict[str, Dict]:
+    """
+    Run the pending channel sends, overlapping them when there are several.
+    
+    SMS and email have no dependency on each other, so "both" modes take as
+    long as the slower channel rather than the sum of the two. A channel
+    that raises is recorded as a failed result for that channel only; the
+    other channel's result is kept.
+    """
+    if len(channels) <= 1:
+        return {key: _channel_result(key, send) for key, send in channels.items()}
+    
+    with ThreadPoolExecutor(max_workers=len(channels)) as executor:
+        futures = {key: executor.submit(_channel_result, key, send) for key, send in channels.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def _channel_result(key: str, send: Callable[[], Dict]) -> Dict:
+    """Call one channel's send, turning an exception into a failed result"""
+    try:
+        return send()
+    except Exception as e:
+        logger.error(f"Error in {key.replace('_result', '')} delivery: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@lru_cache(maxsize=4)
+def get_delivery_queue(path: str) -> DeliveryQueue:
+    """Shared DeliveryQueue per database file"""
+    return DeliveryQueue(path)
+
+
+def _enqueue_deliveries(
+    config: SchedulerConfig,
+    deliveries: Dict[str, List[str]],
+    horoscope_data: Dict,
+    is_couples: bool
+) -> Dict[str, Dict]:
+    """
+    Enqueue one job per destination on each channel's queue.
+    
+    Payloads carry only the destination and the content to send; workers
+    read credentials from their own configuration. SMS jobs hold the ready
+    segments and a count of those already sent, so a retried job resumes
+    where the previous attempt stopped.
+    """
+    queue = get_delivery_queue(config.DELIVERY_QUEUE_PATH)
+    results = {}
+    
+    if "sms" in deliveries:
+        if is_couples:
+            message = format_couples_horoscope_sms(horoscope_data)
+        else:
+            message = format_single_horoscope_sms(horoscope_data)
+        segments = list(split_tagged_message(message))
+        job_ids = [
+            queue.enqueue("sms", {"dst": dst, "segments": segments, "sent": 0})
+            for dst in deliveries["sms"]
+        ]
+        results["sms_result"] = {"success": True, "queued": len(job_ids), "job_ids": job_ids}
+    
+    if "email" in deliveries:
+        job_ids = [
+            queue.enqueue("email", {"to_email": email, "horoscope": horoscope_data, "is_couples": is_couples})
+            for email in deliveries["email"]
+        ]
+        results["email_result"] = {"success": True, "queued": len(job_ids), "job_ids": job_ids}
+    
+    return results
+
+
+def process_delivery_queue(
+    channel: str,
+    config: Optional[SchedulerConfig] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    email_batch_size: int = BULK_BATCH_SIZE
+) -> Dict:
+    """
+    Drain the ready jobs on one channel's delivery queue.
+    
+    Run one worker per channel ("sms", "email") so a slow email provider
+    never holds up SMS. Failed jobs are rescheduled with backoff by the
+    queue, and jobs left leased by a crashed worker are retried once their
+    lease expires.
+    
+    SMS jobs are sent one at a time per worker. Email jobs are claimed in
+    batches and sent through send_to_multiple_emails, so SMTP reuses its
+    connection and Mailgun / SendGrid get one batch request per claim.
+    
+    Args:
+        channel: "sms" or "email"
+        config: SchedulerConfig instance (uses the shared get_config() if None)
+        max_workers: Number of workers claiming and sending concurrently
+        email_batch_size: Maximum email jobs claimed and sent together
+    
+    Returns:
+        Dict with delivered/failed counts
+    """
+    if config is None:
+        config = get_config()
+    if not config.DELIVERY_QUEUE_PATH:
+        raise ValueError("DELIVERY_QUEUE_PATH is not configured")
+    
+    queue = get_delivery_queue(config.DELIVERY_QUEUE_PATH)
+    if channel == "sms":
+        deliver, batch_size = partial(_deliver_sms_jobs, config, queue), 1
+    elif channel == "email":
+        deliver, batch_size = partial(_deliver_email_jobs, config, get_email_config(config)), email_batch_size
+    else:
+        raise ValueError(f"Unknown delivery channel: {channel}")
+    
+    def drain() -> List[bool]:
+        outcomes = []
+        while True:
+            jobs = queue.claim_many(channel, batch_size)
+            if not jobs:
+                break
+            try:
+                results = deliver(jobs)
+            except Exception as e:
+                results = [{"success": False, "error": str(e)}] * len(jobs)
+            for job, result in zip(jobs, results):
+                if result.get("success"):
+                    queue.complete(job)
+                else:
+                    queue.fail(job, result.get("error", "Unknown error"))
+                outcomes.append(bool(result.get("success")))
+        return outcomes
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(drain) for _ in range(max_workers)]
+        outcomes = [ok for future in futures for ok in future.result()]
+    
+    delivered = sum(outcomes)
+    logger.info(f"Delivery queue '{channel}': {delivered} delivered, {len(outcomes) - delivered} failed")
+    return {
+        "channel": channel,
+        "delivered": delivered,
+        "failed": len(outcomes) - delivered
+    }
+
+
+def _deliver_sms_jobs(config: SchedulerConfig, queue: DeliveryQueue, jobs: List[DeliveryJob]) -> List[Dict]:
+    """Send queued SMS jobs, one send per job"""
+    return [_deliver_sms_job(config, queue, job) for job in jobs]
+
+
+def _deliver_sms_job(config: SchedulerConfig, queue: DeliveryQueue, job: DeliveryJob) -> Dict:
+    """
+    Send the segments of one queued SMS job that have not gone out yet.
+    
+    Progress is checkpointed after every segment, so a retry never resends
+    segments an earlier attempt already delivered.
+    """
+    payload = dict(job.payload)
+    segments = payload["segments"]
+    while payload["sent"] < len(segments):
+        result = send_sms_voipms(
+            api_username=config.VOIPMS_USERNAME,
+            api_password=config.VOIPMS_PASSWORD,
+            did=config.VOIPMS_DID,
+            dst=payload["dst"],
+            message=segments[payload["sent"]],
+            split_long_messages=False
+        )
+        if not result.get("success"):
+            return result
+        payload["sent"] += 1
+        if not queue.checkpoint(job, payload):
+            # Another worker holds the job now and resumes from the last checkpoint
+            return {"success": False, "error": "Delivery lease lost", "destination": payload["dst"]}
+    
+    return {
+        "success": True,
+        "segments_sent": len(segments),
+        "total_segments": len(segments),
+        "destination": payload["dst"]
+    }
+
+
+def _deliver_email_jobs(config: SchedulerConfig, email_config: Dict, jobs: List[DeliveryJob]) -> List[Dict]:
+    """
+    Send a batch of queued email jobs, returning one result per job in order.
+    
+    Jobs carrying the same horoscope go out in a single send_to_multiple_emails
+    call; a group that raises fails only its own jobs.
+    """
+    groups: Dict[str, List[int]] = {}
+    for index, job in enumerate(jobs):
+        key = json.dumps([job.payload["is_couples"], job.payload["horoscope"]], sort_keys=True)
+        groups.setdefault(key, []).append(index)
+    
+    results: List[Dict] = [{}] * len(jobs)
+    for indices in groups.values():
+        payload = jobs[indices[0]].payload
+        recipients = [jobs[index].payload["to_email"] for index in indices]
+        try:
+            summary = send_to_multiple_emails(
                 provider=config.EMAIL_PROVIDER,
-                recipients=email_addresses,
-                horoscope_data=horoscope_data,
-                is_couples=True,
+                recipients=recipients,
+                horoscope_data=payload["horoscope"],
+                is_couples=payload["is_couples"],
                 **email_config
             )
-            results["email_result"] = email_result
+            group_results = summary["results"]
+        except Exception as e:
+            logger.error(f"Error sending queued emails: {str(e)}")
+            group_results = [{"success": False, "error": str(e)}] * len(indices)
+        for index, result in zip(indices, group_results):
+            results[index] = result
     
     return results
 
@@ -242,7 +547,10 @@ def get_email_config(config: SchedulerConfig) -> Dict:
             "smtp_port": config.SMTP_PORT,
             "smtp_user": config.SMTP_USER,
             "smtp_password": config.SMTP_PASSWORD,
-            "from_email": config.SMTP_FROM
+            "from_email": config.SMTP_FROM,
+            "pool": True,
+            "max_connections": config.SMTP_POOL_SIZE,
+            "max_messages": config.SMTP_POOL_MAXMSGS
         }
     
     elif config.EMAIL_PROVIDER == "mailgun":
@@ -264,6 +572,12 @@ def get_email_config(config: SchedulerConfig) -> Dict:
 
 # Example usage
 if __name__ == "__main__":
+    # Logging is configured by the entry point, not at import
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
     print("=" * 60)
     print("SCHEDULER MODULE TEST")
     print("=" * 60)
@@ -3,65 +3,265 @@ SMS Module - VoIP.ms Integration
 Sends SMS messages via VoIP.ms REST API with message splitting support
 """
 
+import json
+import math
+import os
+import threading
+import time
 import requests
 import logging
-from typing import Dict, List, Optional, Tuple
-from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from templating import compile_template, render_template
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # VoIP.ms API Configuration
 VOIPMS_API_URL = "https://voip.ms/api/v1/rest.php"
 SMS_MAX_LENGTH = 160  # Standard SMS segment length
 
+# Thread pool size for multi-recipient sends
+DEFAULT_MAX_WORKERS = 8
+
+# Global VoIP.ms request budget shared by every sending thread. Requests are
+# spaced at least 1 / VOIPMS_MAX_RPS seconds apart (0 disables the limit) and
+# at most _MAX_IN_FLIGHT are outstanding at once, keeping the parallel senders
+# under the provider's throttling threshold.
+DEFAULT_VOIPMS_MAX_RPS = 5.0
+_MAX_IN_FLIGHT = 8
+
+
+class RateLimiter:
+    """Thread-safe fixed-interval limiter: at most max_rps acquisitions per second"""
+    
+    def __init__(self, max_rps: float):
+        self.min_interval = 1.0 / max_rps if max_rps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_ts = 0.0
+    
+    def acquire(self) -> None:
+        """Block until the caller's request slot comes up"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_ts - now
+            # Reserve the next slot under the lock, sleep outside it
+            self._next_ts = max(now, self._next_ts) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _read_max_rps() -> float:
+    """VOIPMS_MAX_RPS from the environment, falling back to the default if malformed"""
+    raw = os.getenv("VOIPMS_MAX_RPS")
+    if raw is None or not raw.strip():
+        return DEFAULT_VOIPMS_MAX_RPS
+    try:
+        value = float(raw)
+    except ValueError:
+        value = -1.0
+    if not math.isfinite(value) or value < 0:
+        logger.warning(
+            f"Ignoring invalid VOIPMS_MAX_RPS={raw!r}; using {DEFAULT_VOIPMS_MAX_RPS:g}"
+        )
+        return DEFAULT_VOIPMS_MAX_RPS
+    return value
+
+
+@lru_cache(maxsize=1)
+def _get_limiter() -> RateLimiter:
+    """Process-wide limiter, configured from the environment on the first send"""
+    return RateLimiter(_read_max_rps())
+
+
+_SEMAPHORE = threading.BoundedSemaphore(_MAX_IN_FLIGHT)
+
+# Shared HTTP session so every segment reuses a kept-alive TLS connection to
+# voip.ms instead of paying a fresh handshake per 160-character segment.
+# Retries stay off: a retried sendSMS may deliver the same segment twice.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0)
+)
+
+
+# Retry policy for a single segment: up to 3 attempts with exponential
+# backoff (1s, 2s, ... capped at 30s). Only failures raised before VoIP.ms
+# could have accepted the message are retried: the connection was never
+# established, or VoIP.ms answered 429 / 503 or a rate/quota status. A
+# dropped connection after the request went out, a read timeout or a 502 /
+# 504 from a gateway may follow a delivered SMS, so those are not retried.
+_RETRY_ATTEMPTS = 3
+_RETRY_MIN_WAIT = 1.0
+_RETRY_MAX_WAIT = 30.0
+_RETRY_HTTP_STATUSES = frozenset({429, 503})
+
 
 class VoIPMSError(Exception):
     """Custom exception for VoIP.ms API errors"""
     pass
 
 
-def split_message(message: str, max_length: int = SMS_MAX_LENGTH) -> List[str]:
+class VoIPMSTransientError(VoIPMSError):
+    """VoIP.ms throttled or could not take the request; safe to retry"""
+    pass
+
+
+@lru_cache(maxsize=256)
+def clean_phone(number: str) -> str:
+    """Strip everything but digits from a phone number (memoized per input)"""
+    return ''.join(filter(str.isdigit, number))
+
+
+def iter_split_message(message: str, max_length: int = SMS_MAX_LENGTH) -> Iterator[str]:
     """
-    Split a long message into SMS-sized segments.
+    Lazily split a long message into SMS-sized segments.
     
     Args:
         message: The full message text
         max_length: Maximum length per segment (default 160)
     
-    Returns:
-        List of message segments
+    Yields:
+        Message segments, in order
     """
     if len(message) <= max_length:
-        return [message]
+        yield message
+        return
     
-    segments = []
-    words = message.split()
-    current_segment = ""
+    # Words are packed greedily and joined by single spaces, so collapse all
+    # whitespace runs up front; every break below is then a lone space
+    text = " ".join(message.split())
+    start, end = 0, len(text)
     
-    for word in words:
-        # Check if adding this word would exceed the limit
-        test_segment = current_segment + (" " if current_segment else "") + word
+    while start < end:
+        if end - start <= max_length:
+            yield text[start:]
+            return
         
-        if len(test_segment) <= max_length:
-            current_segment = test_segment
+        # Break at the last space that keeps the segment within max_length
+        cut = text.rfind(" ", start, start + max_length + 1)
+        if cut <= start:
+            # A single word is longer than max_length: hard-split it
+            yield text[start:start + max_length]
+            start += max_length
         else:
-            # Save current segment and start new one
-            if current_segment:
-                segments.append(current_segment)
-            current_segment = word
-            
-            # If a single word is longer than max_length, split it
-            while len(current_segment) > max_length:
-                segments.append(current_segment[:max_length])
-                current_segment = current_segment[max_length:]
+            yield text[start:cut]
+            start = cut + 1
+
+
+@lru_cache(maxsize=128)
+def split_message(message: str, max_length: int = SMS_MAX_LENGTH) -> Tuple[str, ...]:
+    """
+    Split a long message into SMS-sized segments.
     
-    # Add the last segment
-    if current_segment:
-        segments.append(current_segment)
+    Results are memoized: every destination of a multi-recipient send
+    formats the same horoscope text, so only the first call does the split.
     
-    return segments
+    Args:
+        message: The full message text
+        max_length: Maximum length per segment (default 160)
+    
+    Returns:
+        Tuple of message segments
+    """
+    return tuple(iter_split_message(message, max_length))
+
+
+def split_tagged_message(message: str) -> Tuple[str, ...]:
+    """
+    Split a message into the exact segments send_sms_voipms would send.
+    
+    Multi-part messages get their [i/N] indicators, so each segment can be
+    sent on its own with split_long_messages=False.
+    
+    Args:
+        message: The full message text
+    
+    Returns:
+        Tuple of ready-to-send segments
+    """
+    segments = split_message(message)
+    return tuple(_tag_segments(segments, len(segments)))
+
+
+def _tag_segments(segments: Iterable[str], total: int) -> Iterator[str]:
+    """Lazily add [i/N] segment indicators to the `total` segments of a message"""
+    if total <= 1:
+        yield from segments
+        return
+    for i, segment in enumerate(segments, 1):
+        yield f"[{i}/{total}] {segment}"
+
+
+def _is_retryable(error: Exception) -> bool:
+    """True for failures where VoIP.ms certainly did not accept the segment"""
+    if isinstance(error, VoIPMSTransientError):
+        return True
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # requests wraps urllib3's MaxRetryError; its reason tells a failed
+        # connect (refused, DNS, connect timeout) from a connection that
+        # broke after the request was sent
+        reason = error.args[0] if error.args else None
+        return isinstance(getattr(reason, "reason", reason), ConnectTimeoutError)
+    return False
+
+
+def _post_segment(params: Dict) -> Dict:
+    """
+    Send one segment, retrying failures that happened before VoIP.ms could
+    accept it, with exponential backoff.
+    
+    Failed connects and 429 / 503 / rate-limit answers are retried. Broken
+    connections, read timeouts, gateway errors and API errors are not,
+    since VoIP.ms may already have accepted the message.
+    
+    Returns:
+        Parsed VoIP.ms success response
+    """
+    for attempt in range(1, _RETRY_ATTEMPTS + 1):
+        try:
+            return _request_segment(params)
+        except (requests.exceptions.ConnectionError, VoIPMSTransientError) as e:
+            if attempt == _RETRY_ATTEMPTS or not _is_retryable(e):
+                raise
+            wait = min(_RETRY_MIN_WAIT * 2 ** (attempt - 1), _RETRY_MAX_WAIT)
+            logger.warning(f"Transient VoIP.ms failure ({str(e)}); retrying in {wait:.0f}s")
+            time.sleep(wait)
+
+
+def _request_segment(params: Dict) -> Dict:
+    """Issue a single rate-limited sendSMS request and validate the response"""
+    _get_limiter().acquire()
+    with _SEMAPHORE:
+        # POST keeps the credentials and message out of the URL and access logs
+        response = _SESSION.post(VOIPMS_API_URL, data=params, timeout=10)
+    
+    if response.status_code in _RETRY_HTTP_STATUSES:
+        raise VoIPMSTransientError(f"HTTP {response.status_code} from VoIP.ms")
+    response.raise_for_status()
+    
+    # Parse the raw bytes directly: the envelope is tiny JSON, so requests'
+    # charset detection in response.json() costs more than the parse itself
+    try:
+        response_data = json.loads(response.content)
+    except ValueError as e:
+        raise VoIPMSError(f"Invalid response from VoIP.ms: {str(e)}") from e
+    
+    # Check for errors
+    status = response_data.get("status")
+    if status != "success":
+        error_msg = response_data.get("status", "Unknown error")
+        if "rate" in str(status).lower() or "quota" in str(status).lower():
+            raise VoIPMSTransientError(f"API returned error: {error_msg}")
+        logger.error(f"VoIP.ms API error: {error_msg}")
+        raise VoIPMSError(f"API returned error: {error_msg}")
+    
+    return response_data
 
 
 def send_sms_voipms(
@@ -83,58 +283,82 @@ def send_sms_voipms(
         message: Message content
         split_long_messages: If True, automatically split long messages
     
+    Returns:
+        Dict with status and response details
+    """
+    try:
+        # Split message if needed. The [i/N] indicators need N up front, so a
+        # counting pass runs first; the segments themselves are then produced
+        # one at a time as the loop sends them, and an error on an early
+        # segment never splits or formats the rest
+        if split_long_messages:
+            total = sum(1 for _segment in iter_split_message(message))
+            segments = _tag_segments(iter_split_message(message), total)
+            logger.info(f"Message split into {total} segment(s)")
+        else:
+            total = 1
+            segments = iter((message,))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return {
+            "success": False,
+            "error": f"Unexpected error: {str(e)}",
+            "destination": dst
+        }
+    
+    return _send_prepared_segments(
+        _base_params(api_username, api_password, did), dst, segments, total
+    )
+
+
+def _base_params(api_username: str, api_password: str, did: str) -> Dict:
+    """sendSMS parameters shared by every segment and destination"""
+    return {
+        "api_username": api_username,
+        "api_password": api_password,
+        "method": "sendSMS",
+        "did": did
+    }
+
+
+def _send_prepared_segments(
+    base_params: Dict,
+    dst: str,
+    segments: Iterable[str],
+    total: int
+) -> Dict:
+    """
+    Send already split and tagged segments to one destination, in order.
+    
+    segments is consumed lazily and may be a one-shot iterator of `total`
+    items. base_params is shared across destinations (and threads) and is
+    never mutated; phone numbers are cleaned and validated here.
+    
     Returns:
         Dict with status and response details
     """
     try:
         # Clean phone numbers (remove non-digits)
-        did = ''.join(filter(str.isdigit, did))
-        dst = ''.join(filter(str.isdigit, dst))
+        did = clean_phone(base_params["did"])
+        dst = clean_phone(dst)
         
         # Validate phone numbers
         if len(did) < 10 or len(dst) < 10:
             raise VoIPMSError("Invalid phone number format. Must be at least 10 digits.")
         
-        # Split message if needed
-        if split_long_messages:
-            segments = split_message(message)
-            logger.info(f"Message split into {len(segments)} segment(s)")
-        else:
-            segments = [message]
-        
         results = []
         
-        for i, segment in enumerate(segments, 1):
-            # Add segment indicator for multi-part messages
-            if len(segments) > 1:
-                segment_msg = f"[{i}/{len(segments)}] {segment}"
-            else:
-                segment_msg = segment
-            
-            # Build API parameters
-            params = {
-                "api_username": api_username,
-                "api_password": api_password,
-                "method": "sendSMS",
-                "did": did,
-                "dst": dst,
-                "message": segment_msg
-            }
+        # Only the message changes per segment
+        params = {**base_params, "did": did, "dst": dst, "message": None}
+        
+        for i, segment_msg in enumerate(segments, 1):
+            params["message"] = segment_msg
             
-            logger.info(f"Sending segment {i}/{len(segments)} to {dst}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Sending segment {i}/{total} to {dst}")
             
             # Make API request
-            response = requests.get(VOIPMS_API_URL, params=params, timeout=10)
-            response.raise_for_status()
-            
-            # Parse response
-            response_data = response.json()
-            
-            # Check for errors
-            if response_data.get("status") != "success":
-                error_msg = response_data.get("status", "Unknown error")
-                logger.error(f"VoIP.ms API error: {error_msg}")
-                raise VoIPMSError(f"API returned error: {error_msg}")
+            response_data = _post_segment(params)
             
             results.append({
                 "segment": i,
@@ -142,12 +366,13 @@ def send_sms_voipms(
                 "sms_id": response_data.get("sms", "unknown")
             })
             
-            logger.info(f"Segment {i} sent successfully. SMS ID: {response_data.get('sms')}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Segment {i} sent successfully. SMS ID: {response_data.get('sms')}")
         
         return {
             "success": True,
             "segments_sent": len(results),
-            "total_segments": len(segments),
+            "total_segments": total,
             "results": results,
             "destination": dst
         }
@@ -198,12 +423,7 @@ def send_horoscope_sms(
         Dict with sending status
     """
     try:
-        if is_couples:
-            # Format couples horoscope
-            message = format_couples_horoscope_sms(horoscope_data)
-        else:
-            # Format single horoscope
-            message = format_single_horoscope_sms(horoscope_data)
+        message = _format_horoscope_sms(horoscope_data, is_couples)
         
         logger.info(f"Sending horoscope SMS to {dst}")
         logger.info(f"Message length: {len(message)} characters")
@@ -228,25 +448,40 @@ def send_horoscope_sms(
         }
 
 
+def _format_horoscope_sms(horoscope_data: Dict, is_couples: bool) -> str:
+    """Format a single or couples horoscope for SMS delivery"""
+    if is_couples:
+        return format_couples_horoscope_sms(horoscope_data)
+    return format_single_horoscope_sms(horoscope_data)
+
+
+# SMS bodies, compiled once at import time
+_SINGLE_SMS_TPL = compile_template(
+    "✨ Daily Horoscope for {name} ✨\n\n"
+    "{horoscope}\n\n"
+    "🎨 Lucky Color: {lucky_color}\n"
+    "💫 Mantra: {mantra}\n"
+    "🎯 Focus: {daily_focus}"
+)
+
+_COUPLES_SMS_TPL = compile_template(
+    "💕 Couples Horoscope 💕\n"
+    "{name_1} & {name_2}\n\n"
+    "{couples_horoscope}\n\n"
+    "🎨 Lucky Color: {lucky_color}\n"
+    "💫 Shared Mantra: {shared_mantra}\n"
+    "💞 Focus: {relationship_focus}"
+)
+
+
 def format_single_horoscope_sms(data: Dict) -> str:
     """Format single horoscope for SMS delivery"""
-    message = f"✨ Daily Horoscope for {data['name']} ✨\n\n"
-    message += f"{data['horoscope']}\n\n"
-    message += f"🎨 Lucky Color: {data['lucky_color']}\n"
-    message += f"💫 Mantra: {data['mantra']}\n"
-    message += f"🎯 Focus: {data['daily_focus']}"
-    return message
+    return render_template(_SINGLE_SMS_TPL, data)
 
 
 def format_couples_horoscope_sms(data: Dict) -> str:
     """Format couples horoscope for SMS delivery"""
-    message = f"💕 Couples Horoscope 💕\n"
-    message += f"{data['name_1']} & {data['name_2']}\n\n"
-    message += f"{data['couples_horoscope']}\n\n"
-    message += f"🎨 Lucky Color: {data['lucky_color']}\n"
-    message += f"💫 Shared Mantra: {data['shared_mantra']}\n"
-    message += f"💞 Focus: {data['relationship_focus']}"
-    return message
+    return render_template(_COUPLES_SMS_TPL, data)
 
 
 def send_to_multiple(
@@ -255,11 +490,16 @@ def send_to_multiple(
     did: str,
     destinations: List[str],
     horoscope_data: Dict,
-    is_couples: bool = False
+    is_couples: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS
 ) -> Dict:
     """
     Send horoscope to multiple phone numbers.
     
+    The horoscope is formatted and split once, then the same segments are
+    sent to every destination concurrently from a thread pool sharing the
+    module's keep-alive session.
+    
     Args:
         api_username: VoIP.ms API username
         api_password: VoIP.ms API password
@@ -267,23 +507,40 @@ def send_to_multiple(
         destinations: List of destination phone numbers
         horoscope_data: Horoscope data
         is_couples: Whether this is a couples horoscope
+        max_workers: Maximum number of destinations sent to at once
     
     Returns:
         Dict with results for all destinations
     """
-    results = []
+    try:
+        message = _format_horoscope_sms(horoscope_data, is_couples)
+        # Shared by every destination, so materialized once
+        segments = split_tagged_message(message)
+    except Exception as e:
+        logger.error(f"Error sending horoscope SMS: {str(e)}")
+        return _summarize_results(destinations, [
+            {"success": False, "error": str(e), "destination": dst} for dst in destinations
+        ])
     
-    for dst in destinations:
-        result = send_horoscope_sms(
-            api_username=api_username,
-            api_password=api_password,
-            did=did,
-            dst=dst,
-            horoscope_data=horoscope_data,
-            is_couples=is_couples
-        )
-        results.append(result)
+    logger.info(f"Sending horoscope SMS to {len(destinations)} destination(s)")
+    logger.info(f"Message length: {len(message)} characters, {len(segments)} segment(s)")
+    
+    base_params = _base_params(api_username, api_password, did)
+    
+    def send_one(dst: str) -> Dict:
+        return _send_prepared_segments(base_params, dst, segments, len(segments))
+    
+    if len(destinations) <= 1:
+        results = [send_one(dst) for dst in destinations]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(destinations))) as executor:
+            results = list(executor.map(send_one, destinations))
     
+    return _summarize_results(destinations, results)
+
+
+def _summarize_results(destinations: List[str], results: List[Dict]) -> Dict:
+    """Aggregate per-destination results into a delivery summary"""
     success_count = sum(1 for r in results if r.get("success"))
     
     return {
@@ -296,6 +553,8 @@ def send_to_multiple(
 
 # Example usage and testing
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     print("=" * 60)
     print("SMS MODULE TEST")
     print("=" * 60)
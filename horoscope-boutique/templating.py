@@ -0,0 +1,38 @@
+"""
+Templating Module
+Pre-compiled str.format-style templates shared by the generator and senders
+"""
+
+import string
+import sys
+from collections.abc import Mapping
+from typing import Optional, Tuple
+
+CompiledTemplate = Tuple[Tuple[str, Optional[str]], ...]
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    """
+    Pre-parse a str.format template into (literal, field) pairs.
+    
+    Only plain {field} placeholders are supported (no format specs or
+    conversions), which is all the project's templates use.
+    """
+    # Interned field names match the interned keys / attribute names of
+    # horoscope data, so lookups short-circuit on identity
+    return tuple(
+        (literal, None if field is None else sys.intern(field))
+        for literal, field, _spec, _conversion in string.Formatter().parse(template)
+    )
+
+
+def render_template(compiled: CompiledTemplate, data: Mapping) -> str:
+    """
+    Render a compiled template without re-parsing it.
+    
+    data is a horoscope dict from the generator (any mapping works).
+    """
+    return "".join(
+        literal if field is None else literal + str(data[field])
+        for literal, field in compiled
+    )
@@ -4,9 +4,27 @@ Test Script - Comprehensive System Testing
 Tests all modules without requiring API credentials
 """
 
+import email
+import email.policy
+import http.client
+import json
+import os
+import random
+import smtplib
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import requests
+import urllib3.exceptions
+import delivery_queue
+import email_sender
+import scheduler
+import sms
 from generator import generate_single_horoscope, generate_couples_horoscope
-from sms import split_message, format_single_horoscope_sms, format_couples_horoscope_sms
+from sms import split_message, iter_split_message, format_single_horoscope_sms, format_couples_horoscope_sms
 from email_sender import format_plain_text_single, format_plain_text_couples
 
 
@@ -17,6 +35,35 @@ def print_section(title):
     print("=" * 70 + "\n")
 
 
+class FakeResponse:
+    """Stand-in for a requests.Response from a provider API"""
+    
+    def __init__(self, status_code=200, body=b'{"id": "<msg-1>", "status": "success", "sms": "1"}'):
+        self.status_code = status_code
+        self.content = body
+    
+    def json(self):
+        return json.loads(self.content)
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error")
+
+
+class RecordingPost:
+    """Session.post replacement that records every call and replies in turn"""
+    
+    def __init__(self, *responses):
+        self.calls = []
+        self.responses = list(responses) or [FakeResponse()]
+    
+    def __call__(self, url, **kwargs):
+        # Senders may reuse one params dict across requests, so record a snapshot
+        kwargs = {key: dict(value) if isinstance(value, dict) else value for key, value in kwargs.items()}
+        self.calls.append((url, kwargs))
+        return self.responses[min(len(self.calls), len(self.responses)) - 1]
+
+
 def test_horoscope_generation():
     """Test horoscope generation"""
     print_section("TESTING HOROSCOPE GENERATION")
@@ -140,8 +187,11 @@ def test_edge_cases():
         "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
     ]
     
-    for sign in signs:
-        horoscope = generate_single_horoscope("Test", sign)
+    # Signs are independent, so they are generated concurrently
+    with ThreadPoolExecutor(max_workers=len(signs)) as executor:
+        horoscopes = list(executor.map(lambda sign: generate_single_horoscope("Test", sign), signs))
+    
+    for sign, horoscope in zip(signs, horoscopes):
         assert horoscope['sign'] == sign
         assert len(horoscope['horoscope']) > 100
         assert horoscope['lucky_color']
@@ -150,6 +200,22 @@ def test_edge_cases():
     
     print(f"✅ All {len(signs)} zodiac signs work correctly!")
     
+    # Unknown signs are passed through with the default palette
+    unknown = generate_single_horoscope("Test", "ophiuchus")
+    assert unknown['sign'] == "Ophiuchus" and unknown['lucky_color'] == "Blue"
+    print("✅ Unknown signs fall back to the default lucky color")
+    
+    # Generators hand back plain dicts: mutable and JSON-serializable
+    print("\n" + "-" * 70)
+    print("\nTesting generator return types...")
+    for horoscope in (horoscopes[0], generate_couples_horoscope("A", "Leo", "B", "Virgo")):
+        assert type(horoscope) is dict
+        assert json.loads(json.dumps(horoscope)) == horoscope
+        updated = horoscope.copy()
+        updated.update(lucky_color="Teal")
+        assert updated["lucky_color"] == "Teal"
+    print("✅ Horoscopes are plain, JSON-serializable dicts")
+    
     # Test long messages
     print("\n" + "-" * 70)
     print("\nTesting very long message splitting...")
@@ -167,6 +233,752 @@ def test_edge_cases():
     assert len(segments) == 1
 
 
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records messages instead of sending them"""
+    instances = []
+    refused = set()
+    
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.sent = []
+        FakeSMTP.instances.append(self)
+    
+    def ehlo(self):
+        pass
+    
+    def starttls(self):
+        pass
+    
+    def login(self, user, password):
+        pass
+    
+    def sendmail(self, from_addr, to_addrs, msg):
+        if to_addrs[0] in FakeSMTP.refused:
+            raise smtplib.SMTPRecipientsRefused({to_addrs[0]: (550, b"No such user")})
+        self.sent.append((from_addr, to_addrs, msg))
+    
+    def quit(self):
+        pass
+    
+    @classmethod
+    def reset(cls, refused=()):
+        cls.instances = []
+        cls.refused = set(refused)
+
+
+SMTP_CONFIG = {
+    "smtp_host": "smtp.example.com",
+    "smtp_port": 587,
+    "smtp_user": "bot",
+    "smtp_password": "secret",
+    "from_email": "Horoscope Bot <bot@example.com>"
+}
+
+MAILGUN_CONFIG = {"api_key": "key", "domain": "mg.example.com", "from_email": "bot@example.com"}
+
+
+def test_sms_rate_limiter():
+    """Test VoIP.ms request spacing and VOIPMS_MAX_RPS parsing"""
+    print_section("TESTING SMS RATE LIMITER")
+    
+    # Five threads at 20 rps: slots are handed out 50ms apart
+    limiter = sms.RateLimiter(20)
+    stamps = []
+    
+    def acquire():
+        limiter.acquire()
+        stamps.append(time.monotonic())
+    
+    threads = [threading.Thread(target=acquire) for _ in range(5)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stamps.sort()
+    gaps = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+    assert all(gap >= 0.045 for gap in gaps), gaps
+    assert stamps[-1] - started >= 0.19
+    print(f"✅ 5 concurrent acquisitions spaced {min(gaps) * 1000:.0f}ms+ apart")
+    
+    # 0 disables the limit
+    unlimited = sms.RateLimiter(0)
+    started = time.monotonic()
+    for _ in range(100):
+        unlimited.acquire()
+    assert time.monotonic() - started < 0.05
+    print("✅ max_rps=0 never waits")
+    
+    # Malformed values fall back to the default instead of breaking sends
+    for raw, expected in (("fast", sms.DEFAULT_VOIPMS_MAX_RPS), ("-3", sms.DEFAULT_VOIPMS_MAX_RPS),
+                          ("nan", sms.DEFAULT_VOIPMS_MAX_RPS), ("", sms.DEFAULT_VOIPMS_MAX_RPS),
+                          ("2.5", 2.5), ("0", 0.0)):
+        with mock.patch.dict(os.environ, {"VOIPMS_MAX_RPS": raw}):
+            assert sms._read_max_rps() == expected, raw
+    print("✅ VOIPMS_MAX_RPS parsed defensively")
+
+
+SMS_PARAMS = {"api_username": "u", "api_password": "p", "method": "sendSMS",
+              "did": "2025550100", "dst": "2025550111", "message": "hi"}
+
+
+def test_sms_retry_classification():
+    """Test which VoIP.ms failures are retried"""
+    print_section("TESTING SMS RETRY CLASSIFICATION")
+    
+    # A real refused connect, as requests reports it
+    try:
+        requests.post("http://127.0.0.1:9", timeout=2)
+        refused = None
+    except requests.exceptions.ConnectionError as e:
+        refused = e
+    
+    aborted = requests.exceptions.ConnectionError(urllib3.exceptions.ProtocolError(
+        "Connection aborted.", http.client.RemoteDisconnected("Remote end closed connection")
+    ))
+    cases = [
+        (refused, True),
+        (requests.exceptions.ConnectTimeout("connect timed out"), True),
+        (sms.VoIPMSTransientError("HTTP 429 from VoIP.ms"), True),
+        (aborted, False),
+        (requests.exceptions.ReadTimeout("read timed out"), False),
+        (sms.VoIPMSError("API returned error: invalid_dst"), False),
+    ]
+    for error, retryable in cases:
+        if error is not None:
+            assert sms._is_retryable(error) == retryable, repr(error)
+    print("✅ Only failures before VoIP.ms could accept the SMS are retryable")
+    
+    # Status codes: 503 is retried, a 502 from a gateway is not
+    unlimited = sms.RateLimiter(0)
+    with mock.patch.object(sms, "_RETRY_MIN_WAIT", 0), mock.patch.object(sms, "_get_limiter", lambda: unlimited):
+        post = RecordingPost(FakeResponse(503), FakeResponse())
+        with mock.patch.object(sms._SESSION, "post", post):
+            assert sms._post_segment(SMS_PARAMS)["status"] == "success"
+        assert len(post.calls) == 2
+        
+        for status in (502, 504):
+            post = RecordingPost(FakeResponse(status))
+            with mock.patch.object(sms._SESSION, "post", post):
+                try:
+                    sms._post_segment(SMS_PARAMS)
+                    raise AssertionError(f"HTTP {status} should not succeed")
+                except requests.exceptions.HTTPError:
+                    pass
+            assert len(post.calls) == 1
+        
+        def drop(url, **kwargs):
+            drop.calls += 1
+            raise aborted
+        drop.calls = 0
+        with mock.patch.object(sms._SESSION, "post", drop):
+            result = sms.send_sms_voipms("u", "p", "2025550100", "2025550111", "hi")
+        assert drop.calls == 1 and not result["success"]
+    print("✅ 503 retried; 502/504 and dropped connections sent once")
+
+
+def test_split_message_cache():
+    """Test that split_message returns shared, immutable cached tuples"""
+    print_section("TESTING SPLIT CACHE")
+    
+    message = "Memoized horoscope text " * 20
+    first = split_message(message)
+    hits = split_message.cache_info().hits
+    again = split_message(message)
+    
+    assert isinstance(first, tuple)
+    assert again is first
+    assert split_message.cache_info().hits == hits + 1
+    # Different max_length is a different cache entry
+    assert split_message(message, 100) != first
+    print("✅ Repeat splits are served from the cache as the same tuple")
+
+
+def reference_split_message(message, max_length):
+    """The original word-list splitter, kept as the reference for split_message"""
+    if len(message) <= max_length:
+        return [message]
+    segments = []
+    current_segment = ""
+    for word in message.split():
+        test_segment = current_segment + (" " if current_segment else "") + word
+        if len(test_segment) <= max_length:
+            current_segment = test_segment
+        else:
+            if current_segment:
+                segments.append(current_segment)
+            current_segment = word
+            while len(current_segment) > max_length:
+                segments.append(current_segment[:max_length])
+                current_segment = current_segment[max_length:]
+    if current_segment:
+        segments.append(current_segment)
+    return segments
+
+
+def test_split_message_equivalence():
+    """Test that the scanning splitter matches the original word-list splitter"""
+    print_section("TESTING SPLIT EQUIVALENCE")
+    
+    rng = random.Random(20240101)
+    checked = 0
+    for _ in range(3000):
+        words = [
+            "x" * rng.choice((1, 3, 8, 15, 40, 170, 400))
+            for _ in range(rng.randint(0, 40))
+        ]
+        gaps = [rng.choice((" ", " ", "  ", "\n", "\t ")) for _ in words]
+        message = rng.choice(("", " ", "\n")) + "".join(w + g for w, g in zip(words, gaps))
+        if rng.random() < 0.5:
+            message = message.rstrip()
+        for max_length in (10, 50, 160):
+            expected = tuple(reference_split_message(message, max_length))
+            assert split_message(message, max_length) == expected, (message, max_length)
+            assert tuple(iter_split_message(message, max_length)) == expected, (message, max_length)
+            checked += 1
+    print(f"✅ {checked} random message splits match to the original splitter")
+
+
+def test_sms_streamed_send(single):
+    """Test that send_sms_voipms streams segments and stops at the first failure"""
+    print_section("TESTING STREAMED SMS SEND")
+    
+    message = format_single_horoscope_sms(single) + " Streamed."
+    expected = sms.split_tagged_message(message)
+    split_message.cache_clear()
+    unlimited = sms.RateLimiter(0)
+    with mock.patch.object(sms, "_get_limiter", lambda: unlimited):
+        post = RecordingPost()
+        with mock.patch.object(sms._SESSION, "post", post):
+            result = sms.send_sms_voipms("user", "pass", "5559990000", "5551230001", message)
+        assert result["success"] and result["total_segments"] == len(expected)
+        assert [kwargs["data"]["message"] for _url, kwargs in post.calls] == list(expected)
+        # The send consumed iter_split_message directly, never the cached tuple
+        assert split_message.cache_info().currsize == 0
+        print(f"✅ {len(expected)} tagged segments streamed, identical to split_tagged_message")
+        
+        post = RecordingPost(FakeResponse(), FakeResponse(body=b'{"status": "invalid_dst"}'))
+        with mock.patch.object(sms._SESSION, "post", post):
+            result = sms.send_sms_voipms("user", "pass", "5559990000", "5551230001", message)
+        assert not result["success"] and len(post.calls) == 2
+        print("✅ An API error on segment 2 stops the send without producing the rest")
+
+
+def test_sms_multiple_destinations(single):
+    """Test that each destination gets its segments in order and stops at its first failure"""
+    print_section("TESTING MULTI-DESTINATION SMS")
+    
+    segments = sms.split_tagged_message(format_single_horoscope_sms(single))
+    sent = {}
+    lock = threading.Lock()
+    
+    def post(url, data, **kwargs):
+        with lock:
+            sent.setdefault(data["dst"], []).append(data["message"])
+            count = len(sent[data["dst"]])
+        if data["dst"] == "5551230002" and count == 2:
+            return FakeResponse(body=b'{"status": "invalid_dst"}')
+        return FakeResponse()
+    
+    unlimited = sms.RateLimiter(0)
+    with mock.patch.object(sms, "_get_limiter", lambda: unlimited), \
+            mock.patch.object(sms._SESSION, "post", post):
+        summary = sms.send_to_multiple(
+            "user", "pass", "5559990000", ["5551230001", "5551230002", "5551230003"], single
+        )
+    
+    assert summary["successful"] == 2 and summary["failed"] == 1
+    assert sent["5551230001"] == sent["5551230003"] == list(segments)
+    # Segment 2 failed, so segments 3..N never went to that destination
+    assert sent["5551230002"] == list(segments[:2])
+    assert not summary["results"][1]["success"]
+    print(f"✅ {len(segments)} segments in order per destination; a failure on segment 2 stops that destination only")
+
+
+def test_seeded_generation():
+    """Test that random.seed() makes generation reproducible"""
+    print_section("TESTING SEEDED GENERATION")
+    
+    def generate_both():
+        single = dict(generate_single_horoscope("Emma", "Pisces"))
+        couples = dict(generate_couples_horoscope("Alex", "Leo", "Jordan", "Aquarius"))
+        for horoscope in (single, couples):
+            horoscope.pop("generated_at")
+        return single, couples
+    
+    random.seed(2024)
+    first = generate_both()
+    random.seed(2024)
+    assert generate_both() == first
+    print("✅ Same seed, same horoscopes")
+
+
+def test_email_dispatch_and_batching(single):
+    """Test provider dispatch and bulk batch splitting"""
+    print_section("TESTING EMAIL PROVIDER DISPATCH")
+    
+    # Unknown providers fail every recipient without sending anything
+    summary = email_sender.send_to_multiple_emails("pigeon", ["a@example.com", "b@example.com"], single)
+    assert summary["failed"] == 2
+    assert all("Unknown provider" in r["error"] for r in summary["results"])
+    print("✅ Unknown provider reported per recipient")
+    
+    # Mailgun batches hold at most BULK_BATCH_SIZE recipients each
+    recipients = [f"user{i}@example.com" for i in range(email_sender.BULK_BATCH_SIZE * 2 + 1)]
+    post = RecordingPost()
+    with mock.patch.object(email_sender._SESSION, "post", post):
+        summary = email_sender.send_to_multiple_emails(
+            "mailgun", recipients, single,
+            api_key="key", domain="mg.example.com", from_email="bot@example.com"
+        )
+    
+    batch_sizes = sorted(len(kwargs["data"]["to"]) for _url, kwargs in post.calls)
+    assert batch_sizes == [1, email_sender.BULK_BATCH_SIZE, email_sender.BULK_BATCH_SIZE]
+    assert summary["successful"] == len(recipients)
+    assert [r["recipient"] for r in summary["results"]] == recipients
+    print(f"✅ {len(recipients)} recipients sent in {len(post.calls)} batch API calls")
+
+
+def test_email_fallback(single):
+    """Test failover of failed recipients to backup providers"""
+    print_section("TESTING EMAIL PROVIDER FAILOVER")
+    
+    # The primary refuses one recipient; only that one goes to the fallback
+    FakeSMTP.reset(refused={"b@example.com"})
+    post = RecordingPost()
+    with mock.patch("smtplib.SMTP", FakeSMTP), mock.patch.object(email_sender._SESSION, "post", post):
+        summary = email_sender.send_to_multiple_emails(
+            "smtp", ["a@example.com", "b@example.com"], single,
+            providers_fallback=[("mailgun", MAILGUN_CONFIG)],
+            **SMTP_CONFIG
+        )
+    
+    assert summary["successful"] == 2
+    assert [(r["recipient"], r["provider"]) for r in summary["results"]] == [
+        ("a@example.com", "smtp"), ("b@example.com", "mailgun")
+    ]
+    assert [kwargs["data"]["to"] for _url, kwargs in post.calls] == [["b@example.com"]]
+    print("✅ Refused recipient delivered by the fallback provider")
+    
+    # When every provider fails, each recipient keeps the last provider's error
+    FakeSMTP.reset(refused={"a@example.com", "b@example.com"})
+    with mock.patch("smtplib.SMTP", FakeSMTP), \
+            mock.patch.object(email_sender._SESSION, "post", RecordingPost(FakeResponse(500))):
+        summary = email_sender.send_to_multiple_emails(
+            "smtp", ["a@example.com", "b@example.com"], single,
+            providers_fallback=[("mailgun", MAILGUN_CONFIG)],
+            **SMTP_CONFIG
+        )
+    
+    assert summary["failed"] == 2
+    assert all(r["provider"] == "mailgun" and "500" in r["error"] for r in summary["results"])
+    print("✅ Failures recorded per recipient when the fallback also fails")
+
+
+def test_sendgrid_payload():
+    """Test the spliced SendGrid request body against a plain json.dumps"""
+    print_section("TESTING SENDGRID PAYLOAD")
+    
+    recipients = ["a@example.com", "zoë@example.com"]
+    subject, html_body, text_body = "Your Daily Horoscope ✨", '<p class="x">Hi "Zoë"</p>', "Hi\nZoë"
+    post = RecordingPost(FakeResponse(202, b""))
+    with mock.patch.object(email_sender._SESSION, "post", post):
+        results = email_sender.send_email_sendgrid_bulk(
+            "SG.key", "bot@example.com", recipients, subject, html_body, text_body
+        )
+    
+    (_url, kwargs), = post.calls
+    assert json.loads(kwargs["data"]) == {
+        "personalizations": [{"to": [{"email": email}]} for email in recipients],
+        "from": {"email": "bot@example.com"},
+        "subject": subject,
+        "content": [
+            {"type": "text/plain", "value": text_body},
+            {"type": "text/html", "value": html_body}
+        ]
+    }
+    assert kwargs["headers"]["Authorization"] == "Bearer SG.key"
+    assert [r["recipient"] for r in results] == recipients and all(r["success"] for r in results)
+    print("✅ Spliced payload decodes to the full SendGrid request")
+
+
+def test_mailgun_requests():
+    """Test Mailgun endpoint and batch request contents"""
+    print_section("TESTING MAILGUN REQUESTS")
+    
+    recipients = ["a@example.com", "b@example.com"]
+    post = RecordingPost()
+    with mock.patch.object(email_sender._SESSION, "post", post):
+        single = email_sender.send_email_mailgun("key", "mg.one.com", "bot@one.com", "a@example.com", "S", "<p>H</p>", "T")
+        bulk = email_sender.send_email_mailgun_bulk("key", "mg.two.com", "bot@two.com", recipients, "S", "<p>H</p>", "T")
+    
+    (url_1, single_call), (url_2, bulk_call) = post.calls
+    assert url_1 == "https://api.mailgun.net/v3/mg.one.com/messages"
+    assert url_2 == "https://api.mailgun.net/v3/mg.two.com/messages"
+    assert single_call["auth"] == bulk_call["auth"] == ("api", "key")
+    assert bulk_call["data"]["to"] == recipients
+    # Recipient variables make Mailgun send each address its own copy
+    assert json.loads(bulk_call["data"]["recipient-variables"]) == {email: {} for email in recipients}
+    assert single["success"] and single["message_id"] == "<msg-1>"
+    assert [r["recipient"] for r in bulk] == recipients and all(r["success"] for r in bulk)
+    print("✅ Per-domain endpoints and batch recipient variables are correct")
+
+
+def test_http_pool_sizing():
+    """Test that the shared HTTP pool grows to the concurrency callers ask for"""
+    print_section("TESTING HTTP POOL SIZING")
+    
+    def pool_maxsize():
+        return email_sender._SESSION.get_adapter("https://api.mailgun.net")._pool_maxsize
+    
+    initial = pool_maxsize()
+    assert initial >= email_sender.DEFAULT_MAX_WORKERS
+    email_sender._reserve_connections(initial + 24)
+    assert pool_maxsize() == initial + 24
+    # Smaller later senders never shrink the pool under a larger one
+    email_sender._reserve_connections(2)
+    assert pool_maxsize() == initial + 24
+    print(f"✅ Pool grew from {initial} to {initial + 24} connections per host and never shrinks")
+
+
+def test_email_queue(single, couples):
+    """Test grouping, shutdown flushing and results of the background EmailQueue"""
+    print_section("TESTING EMAIL QUEUE")
+    
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    
+    def fake_send_to_multiple(provider, recipients, horoscope_data, is_couples, **config):
+        calls.append((provider, tuple(recipients), is_couples))
+        if provider == "blocker":
+            # Hold the only worker so the next jobs pile up in the queue
+            started.set()
+            release.wait(5)
+        results = [
+            {"success": not email.startswith("bad"), "recipient": email, "provider": provider}
+            for email in recipients
+        ]
+        return {"results": results}
+    
+    email_queue = email_sender.EmailQueue(max_workers=1)
+    with mock.patch.object(email_sender, "send_to_multiple_emails", fake_send_to_multiple):
+        email_queue.enqueue("blocker", "first@example.com", single)
+        assert started.wait(5)
+        
+        futures = {
+            email: email_queue.enqueue("smtp", email, single, **SMTP_CONFIG)
+            for email in ("a@example.com", "bad@example.com", "c@example.com")
+        }
+        futures["d@example.com"] = email_queue.enqueue("smtp", "d@example.com", couples, True, **SMTP_CONFIG)
+        futures["e@example.com"] = email_queue.enqueue("mailgun", "e@example.com", single, **MAILGUN_CONFIG)
+        
+        release.set()
+        email_queue.shutdown(wait=True)
+    
+    # Queued jobs were drained before shutdown returned
+    assert all(future.done() for future in futures.values())
+    
+    # One send per (provider, config, horoscope) group, in arrival order
+    assert calls == [
+        ("blocker", ("first@example.com",), False),
+        ("smtp", ("a@example.com", "bad@example.com", "c@example.com"), False),
+        ("smtp", ("d@example.com",), True),
+        ("mailgun", ("e@example.com",), False)
+    ]
+    print(f"✅ {len(futures)} queued emails delivered in {len(calls) - 1} grouped sends before shutdown")
+    
+    # Every Future resolves to its own recipient's result
+    for email, future in futures.items():
+        result = future.result()
+        assert result["recipient"] == email
+        assert result["success"] == (email != "bad@example.com")
+    print("✅ Each Future reports its own recipient's result")
+
+
+def test_parallel_smtp_sender(single):
+    """Test the process-sharded SMTP sender"""
+    print_section("TESTING PROCESS-SHARDED SMTP SENDER")
+    
+    recipients = [f"user{i}@example.com" for i in range(7)]
+    # Worker processes are forked, so they inherit the patched SMTP class
+    FakeSMTP.reset(refused={"user3@example.com"})
+    with mock.patch("smtplib.SMTP", FakeSMTP):
+        summary = email_sender.send_to_multiple_emails_parallel(
+            "smtp", recipients, single, max_processes=3, **SMTP_CONFIG
+        )
+    
+    assert [r["recipient"] for r in summary["results"]] == recipients
+    assert summary["successful"] == 6 and summary["failed"] == 1
+    assert not summary["results"][3]["success"]
+    # Nothing was sent from this process: every shard ran in a worker
+    assert FakeSMTP.instances == []
+    print(f"✅ {len(recipients)} recipients sent from 3 worker processes, results in order")
+    
+    # HTTP providers are sent in-process
+    with mock.patch.object(email_sender._SESSION, "post", RecordingPost()) as post:
+        summary = email_sender.send_to_multiple_emails_parallel(
+            "mailgun", recipients, single, max_processes=3, **MAILGUN_CONFIG
+        )
+    assert summary["successful"] == len(recipients) and len(post.calls) == 1
+    print("✅ HTTP providers stay in-process with one batch call")
+
+
+def parse_mime(raw):
+    """Parse wire bytes back into a message, failing on any parser defect"""
+    message = email.message_from_bytes(raw, policy=email.policy.default)
+    assert not message.defects, message.defects
+    return message
+
+
+def test_smtp_mime(single):
+    """Test the hand-assembled SMTP messages by parsing them back"""
+    print_section("TESTING SMTP MIME ASSEMBLY")
+    
+    subject, html_body, text_body = "Dein Horoskop ✨", "<p>Liebe Zoë, 🌙</p>", "Liebe Zoë,\n🌙"
+    config = dict(SMTP_CONFIG, from_email="Horoskop Bøt <bot@example.com>")
+    
+    FakeSMTP.reset()
+    with mock.patch("smtplib.SMTP", FakeSMTP):
+        result = email_sender.send_email_smtp(
+            to_email="Zoë <zoe@example.com>", subject=subject,
+            html_body=html_body, text_body=text_body, **config
+        )
+        batch = email_sender.send_email_smtp_batch(
+            recipients=["a@example.com", "Zoë <zoe@example.com>"], subject=subject,
+            html_body=html_body, text_body=text_body, **config
+        )
+    assert result["success"] and all(r["success"] for r in batch)
+    
+    sent = [raw for server in FakeSMTP.instances for _from, _to, raw in server.sent]
+    assert len(sent) == 3
+    for raw, to in zip(sent, ["Zoë <zoe@example.com>", "a@example.com", "Zoë <zoe@example.com>"]):
+        message = parse_mime(raw)
+        assert message["Subject"] == subject
+        assert message["From"].addresses[0].display_name == "Horoskop Bøt"
+        assert message["From"].addresses[0].addr_spec == "bot@example.com"
+        assert str(message["To"]) == to
+        assert message.get_content_type() == "multipart/alternative"
+        parts = list(message.iter_parts())
+        assert [part.get_content_type() for part in parts] == ["text/plain", "text/html"]
+        assert [part.get_content() for part in parts] == [text_body, html_body]
+    print("✅ Single and batch messages parse back with headers and both parts intact")
+    
+    # A real rendered horoscope round-trips too
+    subject, html_body, text_body = email_sender._render_bodies(single)
+    message = parse_mime(email_sender._assemble_mime(subject, None, "a@example.com", text_body, html_body))
+    assert message["From"] == ""
+    assert [part.get_content() for part in message.iter_parts()] == [text_body, html_body]
+    print("✅ Rendered horoscope round-trips; unset From gives an empty header")
+
+
+def make_scheduler_config(mode, **overrides):
+    """SchedulerConfig with fake credentials for every channel"""
+    config = scheduler.SchedulerConfig()
+    config.DELIVERY_MODE = mode
+    config.PHONE, config.PHONE_1, config.PHONE_2 = "5551230001", "5551230001", "5551230002"
+    config.EMAIL, config.EMAIL_1, config.EMAIL_2 = "a@example.com", "a@example.com", "b@example.com"
+    config.VOIPMS_USERNAME, config.VOIPMS_PASSWORD, config.VOIPMS_DID = "user", "pass", "5559990000"
+    config.EMAIL_PROVIDER = "smtp"
+    config.DELIVERY_QUEUE_PATH = ""
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def test_scheduler_channel_isolation():
+    """Test that one channel raising does not lose the other channel's result"""
+    print_section("TESTING SCHEDULER CHANNEL ISOLATION")
+    
+    def broken_sms(**kwargs):
+        raise requests.ConnectionError("VoIP.ms unreachable")
+    
+    sent_email = {"success": True, "provider": "smtp"}
+    with mock.patch.object(scheduler, "send_horoscope_sms", broken_sms), \
+            mock.patch.object(scheduler, "send_horoscope_email", lambda **kwargs: sent_email):
+        results = scheduler.send_daily_horoscope(make_scheduler_config("both"))
+    
+    assert results["sms_result"] == {"success": False, "error": "VoIP.ms unreachable"}
+    assert results["email_result"] is sent_email
+    print("✅ A raising SMS send is recorded per channel; the email result is kept")
+    
+    # A lone channel is run inline and isolated the same way
+    with mock.patch.object(scheduler, "send_horoscope_sms", broken_sms):
+        results = scheduler.send_daily_horoscope(make_scheduler_config("sms"))
+    assert results["sms_result"]["success"] is False and "error" not in results
+    print("✅ A single raising channel becomes that channel's failed result")
+
+
+class FakeClock:
+    """Stand-in for the time module inside delivery_queue"""
+    
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+
+def test_delivery_queue():
+    """Test the SQLite delivery queue's leasing, backoff and dead-lettering"""
+    print_section("TESTING DELIVERY QUEUE")
+    
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(delivery_queue, "time", clock):
+        queue = delivery_queue.DeliveryQueue(os.path.join(tmp, "queue.db"), lease_seconds=60, max_attempts=3)
+        first = queue.enqueue("sms", {"dst": "5551230001"})
+        second = queue.enqueue("sms", {"dst": "5551230002"})
+        queue.enqueue("email", {"to_email": "a@example.com"})
+        try:
+            queue.enqueue("fax", {})
+            raise AssertionError("unknown channel accepted")
+        except delivery_queue.DeliveryQueueError:
+            pass
+        
+        # Oldest first, per channel, and a leased job is not handed out twice
+        job = queue.claim("sms")
+        assert (job.id, job.payload, job.attempts) == (first, {"dst": "5551230001"}, 1)
+        assert queue.claim("sms").id == second
+        assert queue.claim("sms") is None
+        assert queue.complete(job)
+        assert not queue.complete(job)
+        print("✅ Enqueue, oldest-first claim and complete")
+        
+        # Failures back off exponentially, then the job is parked as dead
+        job = queue.claim("email")
+        assert queue.fail(job, "mailbox full")
+        assert queue.claim("email") is None
+        clock.now += 2
+        job = queue.claim("email")
+        assert job.attempts == 2 and queue.fail(job, "mailbox full")
+        clock.now += 3.9
+        assert queue.claim("email") is None
+        clock.now += 0.1
+        job = queue.claim("email")
+        assert job.attempts == 3 and queue.fail(job, "mailbox full")
+        clock.now += 3600
+        assert queue.claim("email") is None
+        assert queue.counts("email") == {"dead": 1}
+        print("✅ Backoff of 2s then 4s, dead after max_attempts")
+        
+        # An expired lease is claimable again, and the stale holder is locked out
+        stale = queue.claim_many("sms", 10)
+        assert [j.id for j in stale] == [second]
+        stale = stale[0]
+        clock.now += 61
+        current = queue.claim("sms")
+        assert current.id == second and current.lease_token != stale.lease_token
+        assert not queue.checkpoint(stale, {"dst": "stale"})
+        assert not queue.complete(stale)
+        assert not queue.fail(stale, "late failure")
+        assert queue.checkpoint(current, {"dst": "5551230002", "sent": 1})
+        assert queue.complete(current)
+        assert queue.counts() == {"done": 2, "dead": 1}
+        print("✅ Expired leases are reclaimed; updates under a stale lease are rejected")
+
+
+def test_scheduler_queued_sms(single):
+    """Test that a retried SMS job resumes after its last delivered segment"""
+    print_section("TESTING QUEUED SMS DELIVERY")
+    
+    segments = sms.split_tagged_message(format_single_horoscope_sms(single))
+    assert len(segments) > 2
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_scheduler_config("sms", DELIVERY_QUEUE_PATH=os.path.join(tmp, "queue.db"))
+        with mock.patch.object(scheduler, "generate_single_horoscope", lambda **kwargs: single):
+            results = scheduler.send_daily_horoscope(config)
+        assert results["sms_result"]["queued"] == 1
+        queue = scheduler.get_delivery_queue(config.DELIVERY_QUEUE_PATH)
+        
+        sent = []
+        failures = iter([False, True])  # the second segment fails once
+        
+        def flaky_send_sms(message, split_long_messages, **kwargs):
+            assert not split_long_messages
+            if next(failures, False):
+                return {"success": False, "error": "Network error: connection reset"}
+            sent.append(message)
+            return {"success": True}
+        
+        with mock.patch.object(scheduler, "send_sms_voipms", flaky_send_sms):
+            summary = scheduler.process_delivery_queue("sms", config, max_workers=1)
+            assert summary["failed"] == 1
+            # Skip the retry backoff
+            queue._connection().execute("UPDATE delivery_jobs SET available_at = 0")
+            summary = scheduler.process_delivery_queue("sms", config, max_workers=1)
+        
+        assert summary["delivered"] == 1
+        assert sent == list(segments)
+        assert queue.counts("sms") == {"done": 1}
+        print(f"✅ {len(segments)} segments each sent exactly once across a failed and a retried attempt")
+
+
+def test_scheduler_delivery_modes():
+    """Test the channel flags parsed from DELIVERY_MODE"""
+    print_section("TESTING DELIVERY MODES")
+    
+    modes = {
+        "sms": (False, True, False),
+        "email": (False, False, True),
+        "both": (False, True, True),
+        "couple_sms": (True, True, False),
+        "couple_email": (True, False, True),
+        "couple_both": (True, True, True),
+    }
+    config = scheduler.SchedulerConfig()
+    for mode, flags in modes.items():
+        # Reassigning the mode on one config must re-derive every flag
+        config.DELIVERY_MODE = mode
+        assert config.DELIVERY_MODE == mode
+        assert (config.is_couples, config.wants_sms, config.wants_email) == flags, mode
+    print(f"✅ All {len(modes)} delivery modes map to the right channel flags")
+    
+    with mock.patch.dict(os.environ, {"DELIVERY_MODE": "couple_both"}):
+        config = scheduler.SchedulerConfig()
+    assert config.is_couples and config.wants_sms and config.wants_email
+    print("✅ DELIVERY_MODE from the environment is parsed at construction")
+    
+    # Malformed pool settings fall back to their defaults instead of failing every run
+    for size, maxmsgs, expected in (("8", "250", (8, 250)), ("lots", "0", (5, 100)), ("-2", " ", (5, 100))):
+        with mock.patch.dict(os.environ, {"SMTP_POOL_SIZE": size, "SMTP_POOL_MAXMSGS": maxmsgs}):
+            config = scheduler.SchedulerConfig()
+        assert (config.SMTP_POOL_SIZE, config.SMTP_POOL_MAXMSGS) == expected, (size, maxmsgs)
+    print("✅ Invalid SMTP_POOL_SIZE / SMTP_POOL_MAXMSGS fall back to 5 / 100")
+
+
+def test_scheduler_queued_email():
+    """Test that queued email skips direct-send setup and drains in batches"""
+    print_section("TESTING QUEUED EMAIL DELIVERY")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_scheduler_config("couple_email", DELIVERY_QUEUE_PATH=os.path.join(tmp, "queue.db"))
+        email_config = mock.Mock(wraps=scheduler.get_email_config)
+        with mock.patch.object(scheduler, "get_email_config", email_config):
+            results = scheduler.send_daily_horoscope(config)
+            assert results["email_result"]["queued"] == 2
+            # Provider settings are the worker's concern, not the enqueuer's
+            assert not email_config.called
+            print("✅ Enqueueing builds no email provider configuration")
+            
+            calls = []
+            
+            def fake_send_to_multiple_emails(provider, recipients, horoscope_data, is_couples, **kwargs):
+                calls.append(recipients)
+                return {"results": [
+                    {"recipient": r, "success": r == "a@example.com", "error": "mailbox full"}
+                    for r in recipients
+                ]}
+            
+            with mock.patch.object(scheduler, "send_to_multiple_emails", fake_send_to_multiple_emails):
+                summary = scheduler.process_delivery_queue("email", config, max_workers=1)
+        
+        assert calls == [["a@example.com", "b@example.com"]]
+        assert summary == {"channel": "email", "delivered": 1, "failed": 1}
+        assert scheduler.get_delivery_queue(config.DELIVERY_QUEUE_PATH).counts("email") == {"done": 1, "pending": 1}
+        print("✅ Both queued emails went out in one batch, each job settled on its own result")
+
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "=" * 70)
@@ -188,6 +1000,33 @@ def run_all_tests():
         # Test edge cases
         test_edge_cases()
         
+        test_seeded_generation()
+        
+        # Test SMS delivery internals (the VoIP.ms API is faked)
+        test_sms_rate_limiter()
+        test_sms_retry_classification()
+        test_split_message_cache()
+        test_split_message_equivalence()
+        test_sms_streamed_send(single)
+        test_sms_multiple_destinations(single)
+        
+        # Test email delivery paths (providers are faked)
+        test_email_dispatch_and_batching(single)
+        test_email_fallback(single)
+        test_sendgrid_payload()
+        test_smtp_mime(single)
+        test_mailgun_requests()
+        test_http_pool_sizing()
+        test_email_queue(single, couples)
+        test_parallel_smtp_sender(single)
+        
+        # Test scheduled delivery (senders are faked)
+        test_scheduler_channel_isolation()
+        test_scheduler_delivery_modes()
+        test_scheduler_queued_email()
+        test_delivery_queue()
+        test_scheduler_queued_sms(single)
+        
         # Success summary
         print_section("TEST SUMMARY")
         print("✅ All tests passed successfully!")
@@ -200,6 +1039,26 @@ def run_all_tests():
         print("   • Email HTML template availability")
         print("   • All 12 zodiac signs")
         print("   • Edge cases (long/short messages)")
+        print("   • Reproducible output under random.seed()")
+        print("   • SMS rate limiter")
+        print("   • SMS retry classification")
+        print("   • split_message cache")
+        print("   • split_message equivalence with the original splitter")
+        print("   • Streamed SMS send")
+        print("   • Multi-destination SMS ordering and failure")
+        print("   • Email provider dispatch and bulk batching")
+        print("   • Email provider failover")
+        print("   • SendGrid request payload")
+        print("   • SMTP MIME assembly (parsed back)")
+        print("   • Mailgun request contents")
+        print("   • HTTP connection pool sizing")
+        print("   • Background email queue")
+        print("   • Process-sharded SMTP sender")
+        print("   • Scheduler per-channel failure isolation")
+        print("   • DELIVERY_MODE channel flags and pool settings")
+        print("   • Queued email delivery in batches")
+        print("   • Delivery queue leasing, backoff and dead-lettering")
+        print("   • Queued SMS resumes after sent segments")
         
         print("\n🎯 Next steps:")
         print("   1. Configure your API credentials in .env")